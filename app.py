@@ -17,11 +17,11 @@ from datetime import datetime
 from io import BytesIO
 from calculator import StudyCostCalculator, InvalidInputError, CalculationError
 from pdf_generator import generate_pdf_report
-from city_database import get_countries, get_cities, get_city_data, get_currency_symbol
+from city_database import get_countries, get_cities, get_city_view
 from auth import is_logged_in, get_current_user_id, get_current_user_email, show_login_form, show_register_form, logout_user
 from database import Database
-from subscription import SubscriptionManager
-from payment import PaymentManager
+from subscription import SubscriptionManager, begin_request
+from payment import get_payment_manager
 from stats import StatsManager
 
 # 页面配置
@@ -65,8 +65,30 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# 过期订阅降级的执行间隔（秒）
+SWEEP_INTERVAL = 3600
+
+@st.cache_resource(ttl=SWEEP_INTERVAL)
+def sweep_expired_subscriptions() -> int:
+    """
+    把已过期的订阅批量降级为免费版
+    
+    st.cache_resource 在进程内缓存返回值，TTL到期前的重复调用直接返回，
+    所以每个进程每 SWEEP_INTERVAL 秒最多执行一次数据库更新。
+    
+    返回:
+        本次降级的用户数
+    """
+    return SubscriptionManager(Database()).sweep_expired()
+
 def main():
     """主函数"""
+    # 每次运行脚本都是一次新请求，同一次运行内订阅使用信息只查询一次
+    begin_request()
+    
+    # 定期把过期订阅写回为免费版（读取订阅时只按过期处理，不写库）
+    sweep_expired_subscriptions()
+    
     # 用户认证检查
     if not is_logged_in():
         # 显示登录/注册页面
@@ -86,8 +108,9 @@ def main():
     # 已登录用户继续
     user_id = get_current_user_id()
     user_email = get_current_user_email()
-    subscription_manager = SubscriptionManager()
+    # 各管理器共用同一个Database（连接池在进程内按数据库共享）
     db = Database()
+    subscription_manager = SubscriptionManager(db)
     
     # 获取用户订阅信息
     usage_info = subscription_manager.get_usage_info(user_id)
@@ -129,7 +152,7 @@ def main():
     
     # 使用统计页面
     if st.session_state.get('show_stats', False):
-        show_stats_page(user_id)
+        show_stats_page(user_id, db)
         return
     
     # 显示使用提示
@@ -162,8 +185,8 @@ def main():
         )
         
         # 获取城市数据以显示货币信息
-        city_data = get_city_data(country, city)
-        currency_symbol = get_currency_symbol(city_data.currency) if city_data else "€"
+        city_view = get_city_view(country, city)
+        currency_symbol = city_view[0] if city_view else "€"
         
         # 房租类型
         rent_type = st.selectbox(
@@ -264,8 +287,8 @@ def main():
         
         with st.spinner("正在计算，请稍候..."):
             try:
-                # 创建计算器实例
-                calculator = StudyCostCalculator(
+                # 创建计算器实例（相同输入复用缓存的实例）
+                calculator = StudyCostCalculator.build(
                     country=country,
                     city=city,
                     rent_type=rent_type,
@@ -279,7 +302,7 @@ def main():
                 
                 # 执行计算
                 summary = calculator.get_summary()
-                df = summary["cashflow_df"]
+                df = summary["cashflow"].to_dataframe()
                 
                 # 保存计算记录到数据库
                 inputs_data = {
@@ -303,7 +326,7 @@ def main():
                     'need_support': summary['need_support']
                 }
                 
-                calculation_id = db.save_calculation(user_id, country, city, inputs_data, results_data)
+                calculation_id, _ = db.save_calculation(user_id, country, city, inputs_data, results_data)
                 
                 # 缓存结果到session_state
                 st.session_state['last_calculation'] = {
@@ -682,7 +705,7 @@ def show_subscription_page(user_id: int, subscription_manager: SubscriptionManag
     
     # 订阅计划
     if not usage_info['is_pro']:
-        payment_manager = PaymentManager()
+        payment_manager = get_payment_manager()
         payment_manager.show_payment_options(user_id)
     else:
         st.success("✅ 您已经是专业版用户，享受所有功能！")
@@ -696,9 +719,9 @@ def show_subscription_page(user_id: int, subscription_manager: SubscriptionManag
         st.rerun()
 
 
-def show_stats_page(user_id: int):
+def show_stats_page(user_id: int, db: Database):
     """显示使用统计页面"""
-    stats_manager = StatsManager()
+    stats_manager = StatsManager(db)
     stats_manager.show_user_stats_dashboard(user_id)
     
     if st.button("← 返回", use_container_width=True):
@@ -5,23 +5,65 @@
 """
 
 import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
 import streamlit as st
 from database import Database
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
+
+
+# 登录验证缓存：(邮箱, 密码摘要) -> (过期时间, 用户ID)
+# 只缓存验证成功的结果，失败的登录每次都会走完整的scrypt校验
+AUTH_CACHE_TTL = 300  # 秒
+AUTH_CACHE_MAXSIZE = 1024
+_auth_cache: "OrderedDict[Tuple[str, str], Tuple[float, int]]" = OrderedDict()
+_auth_cache_lock = threading.Lock()
+
+# 模块级数据库实例（首次使用时创建）
+_db: Optional[Database] = None
+_db_lock = threading.Lock()
+
+# scrypt参数（n=2^15, r=8 约需32MB内存）
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 32
+SCRYPT_MAXMEM = 64 * 1024 * 1024
+
+
+def _get_db() -> Database:
+    """获取模块共享的数据库实例"""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = Database()
+    return _db
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    """使用scrypt派生密钥"""
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=SCRYPT_MAXMEM, dklen=SCRYPT_DKLEN)
 
 
 def hash_password(password: str) -> str:
     """
-    对密码进行哈希处理
+    对密码进行哈希处理（scrypt + 随机盐）
     
     参数:
         password: 原始密码
         
     返回:
-        密码哈希值
+        密码哈希值，格式: scrypt$n$r$p$盐$哈希
     """
-    return hashlib.sha256(password.encode()).hexdigest()
+    salt = secrets.token_bytes(16)
+    derived = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${derived.hex()}"
 
 
 def verify_password(password: str, password_hash: str) -> bool:
@@ -30,12 +72,78 @@ def verify_password(password: str, password_hash: str) -> bool:
     
     参数:
         password: 原始密码
-        password_hash: 密码哈希值
+        password_hash: 密码哈希值（兼容旧版无盐SHA-256哈希）
         
     返回:
         是否匹配
     """
-    return hash_password(password) == password_hash
+    if not password_hash.startswith('scrypt$'):
+        # 旧版SHA-256哈希
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, password_hash)
+    
+    try:
+        _, n, r, p, salt_hex, hash_hex = password_hash.split('$')
+        derived = _scrypt(password, bytes.fromhex(salt_hex), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(derived.hex(), hash_hex)
+
+
+def _verify_cached(email: str, password: str) -> Optional[int]:
+    """
+    带缓存的登录验证（缓存命中时跳过scrypt计算和所有数据库操作），完整校验成功时同时记录最后登录时间
+    
+    参数:
+        email: 邮箱
+        password: 原始密码
+        
+    返回:
+        验证成功返回用户ID，否则返回None
+    """
+    # 缓存键只保存密码的SHA-256摘要，不在内存中保留明文
+    key = (email, hashlib.sha256(password.encode()).hexdigest())
+    now = time.monotonic()
+    
+    cached_id = None
+    with _auth_cache_lock:
+        entry = _auth_cache.get(key)
+        if entry is not None:
+            expires, user_id = entry
+            if now < expires:
+                _auth_cache.move_to_end(key)
+                cached_id = user_id
+            else:
+                del _auth_cache[key]
+    
+    # 缓存命中时不写数据库：最后登录时间只在缓存未命中（完整校验）时更新，最多滞后 AUTH_CACHE_TTL 秒
+    if cached_id is not None:
+        return cached_id
+    
+    # 查询密码哈希、校验、更新登录时间在数据库层一次完成
+    user_id = _get_db().authenticate_user(email, lambda password_hash: verify_password(password, password_hash))
+    if user_id is None:
+        return None
+    
+    with _auth_cache_lock:
+        _auth_cache[key] = (now + AUTH_CACHE_TTL, user_id)
+        _auth_cache.move_to_end(key)
+        while len(_auth_cache) > AUTH_CACHE_MAXSIZE:
+            _auth_cache.popitem(last=False)
+    
+    return user_id
+
+
+def invalidate_auth_cache(email: str):
+    """
+    清除指定邮箱的登录验证缓存（修改密码等场景需要调用）
+    
+    参数:
+        email: 邮箱
+    """
+    with _auth_cache_lock:
+        for key in [k for k in _auth_cache if k[0] == email]:
+            del _auth_cache[key]
 
 
 def is_logged_in() -> bool:
@@ -63,14 +171,14 @@ def login_user(user_id: int, email: str):
     """
     st.session_state['user_id'] = user_id
     st.session_state['user_email'] = email
-    
-    # 更新最后登录时间
-    db = Database()
-    db.update_user_login(user_id)
+    # 最后登录时间已在 authenticate_user 校验成功时记录
 
 
 def logout_user():
     """登出用户"""
+    email = st.session_state.get('user_email')
+    if email:
+        invalidate_auth_cache(email)
     if 'user_id' in st.session_state:
         del st.session_state['user_id']
     if 'user_email' in st.session_state:
@@ -98,7 +206,7 @@ def register_user(email: str, password: str) -> tuple[bool, str]:
         return False, "密码长度至少6位"
     
     # 创建用户
-    db = Database()
+    db = _get_db()
     password_hash = hash_password(password)
     user_id = db.create_user(email, password_hash)
     
@@ -119,16 +227,12 @@ def authenticate_user(email: str, password: str) -> tuple[bool, Optional[int], s
     返回:
         (是否成功, 用户ID, 错误信息)
     """
-    db = Database()
-    user = db.get_user_by_email(email)
+    user_id = _verify_cached(email, password)
     
-    if not user:
+    if user_id is None:
         return False, None, "邮箱或密码错误"
     
-    if verify_password(password, user['password_hash']):
-        return True, user['id'], "登录成功"
-    else:
-        return False, None, "邮箱或密码错误"
+    return True, user_id, "登录成功"
 
 
 def show_login_form():
@@ -14,14 +14,24 @@
 - 提取配置常量
 """
 
-import pandas as pd
-from typing import Dict, Tuple, List, Optional
+import numpy as np
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, ClassVar, Dict, Sequence, Tuple, List, Optional
 from datetime import datetime
 from city_database import (
-    get_city_data, get_rent_by_type, get_currency_symbol,
-    get_countries, get_cities
+    CostData, get_city_data, get_rent_by_type, get_currency_symbol,
+    get_countries, get_cities, get_country_set, get_city_set, canonicalize
 )
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# 支持的房租类型和学费支付方式
+_RENT_TYPES = frozenset({"单间", "合租", "宿舍"})
+_TUITION_PAYMENTS = frozenset({"一次性", "分期"})
+
 
 class CalculationError(Exception):
     """自定义计算错误基类"""
@@ -33,77 +43,158 @@ class InvalidInputError(CalculationError):
     pass
 
 
+@dataclass
+class Cashflow:
+    """12个月现金流计算结果"""
+    months: Tuple[str, ...]  # 月份名称
+    income: np.ndarray  # 月收入
+    expense: np.ndarray  # 月支出
+    balance: np.ndarray  # 累计余额
+    columns: Tuple[str, str, str, str]  # 表格列名（月份/收入/支出/余额）
+    
+    def to_dataframe(self) -> "pd.DataFrame":
+        """转换为DataFrame（仅在界面展示和导出时使用）"""
+        import pandas as pd
+        
+        month_col, income_col, expense_col, balance_col = self.columns
+        return pd.DataFrame({
+            month_col: self.months,
+            income_col: self.income,
+            expense_col: self.expense,
+            balance_col: self.balance
+        })
+
+
+@dataclass(slots=True, frozen=True)
 class StudyCostCalculator:
-    """留学生成本计算器核心类（全球版）"""
+    """
+    留学生成本计算器核心类（全球版）
     
-    # 配置常量
-    WEEKS_PER_MONTH = 4.33  # 每月周数（52周/12月）
-    TUITION_PAYMENT_MONTHS = 10  # 分期付款月数
+    实例不可变，可以作为缓存键；相同输入请使用build()复用已创建的实例。
     
-    def __init__(self, 
-                 country: str,
-                 city: str,
-                 rent_type: str,
-                 has_job: bool,
-                 weekly_hours: float,
-                 hourly_wage: float,  # 新增：自定义小时工资
-                 initial_deposit: float,
-                 tuition_total: float,
-                 tuition_payment: str):
-        """
-        初始化计算器（全球版，支持自定义工资）
+    参数:
+        country: 国家名称
+        city: 城市名称
+        rent_type: 房租类型（单间/合租/宿舍）
+        has_job: 是否打工
+        weekly_hours: 每周工作小时数
+        hourly_wage: 小时工资（当地货币）
+        initial_deposit: 初始存款（当地货币）
+        tuition_total: 学费总额（当地货币）
+        tuition_payment: 学费支付方式（一次性/分期）
         
-        参数:
-            country: 国家名称
-            city: 城市名称
-            rent_type: 房租类型（单间/合租/宿舍）
-            has_job: 是否打工
-            weekly_hours: 每周工作小时数
-            hourly_wage: 小时工资（当地货币）
-            initial_deposit: 初始存款（当地货币）
-            tuition_total: 学费总额（当地货币）
-            tuition_payment: 学费支付方式（一次性/分期）
-            
-        异常:
-            InvalidInputError: 输入无效时抛出
-        """
+    异常:
+        InvalidInputError: 输入无效时抛出
+    """
+    
+    # 配置常量
+    WEEKS_PER_MONTH: ClassVar[float] = 4.33  # 每月周数（52周/12月）
+    TUITION_PAYMENT_MONTHS: ClassVar[int] = 10  # 分期付款月数
+    
+    # 12个月的月份名称（从9月开始，假设是学年开始）
+    MONTH_NAMES: ClassVar[Tuple[str, ...]] = ("9月", "10月", "11月", "12月", "1月", "2月",
+                                              "3月", "4月", "5月", "6月", "7月", "8月")
+    
+    # 用户输入
+    country: str
+    city: str
+    rent_type: str
+    has_job: bool
+    weekly_hours: float
+    hourly_wage: float  # 新增：自定义小时工资
+    initial_deposit: float
+    tuition_total: float
+    tuition_payment: str
+    
+    # 派生数据（在__post_init__中计算）
+    city_data: CostData = field(init=False, repr=False, compare=False)
+    currency: str = field(init=False, compare=False)
+    currency_symbol: str = field(init=False, compare=False)
+    data_sources: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    monthly_rent: float = field(init=False, compare=False)
+    monthly_living_cost: float = field(init=False, compare=False)
+    monthly_income: float = field(init=False, compare=False)
+    tuition_monthly: float = field(init=False, compare=False)
+    _col_income: str = field(init=False, repr=False, compare=False)
+    _col_expense: str = field(init=False, repr=False, compare=False)
+    _col_balance: str = field(init=False, repr=False, compare=False)
+    _tuition_by_month: np.ndarray = field(init=False, repr=False, compare=False)
+    
+    # 计算结果缓存（初始化后输入不再变化，结果可以复用）
+    _cashflow: Optional[Cashflow] = field(default=None, init=False, repr=False, compare=False)
+    _summary: Optional[Dict] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        """验证输入并计算派生数据"""
         # 输入验证
-        self._validate_inputs(country, city, rent_type, weekly_hours, hourly_wage, 
-                             initial_deposit, tuition_total, tuition_payment)
-        
-        self.country = country
-        self.city = city
-        self.rent_type = rent_type
-        self.has_job = has_job
-        self.weekly_hours = weekly_hours if has_job else 0.0
-        self.hourly_wage = hourly_wage
-        self.initial_deposit = initial_deposit
-        self.tuition_total = tuition_total
-        self.tuition_payment = tuition_payment
+        self._validate_inputs(self.country, self.city, self.rent_type, self.weekly_hours,
+                              self.hourly_wage, self.initial_deposit, self.tuition_total,
+                              self.tuition_payment)
+        
+        # 实例是冻结的，派生字段只能通过object.__setattr__写入
+        set_attr = object.__setattr__
+        
+        # 换成数据库里驻留的键，后续各次查询都复用同一对象
+        country, city = canonicalize(self.country, self.city)
+        set_attr(self, 'country', country)
+        set_attr(self, 'city', city)
+        
+        if not self.has_job:
+            set_attr(self, 'weekly_hours', 0.0)
         
         # 获取城市生活成本数据
-        city_data = get_city_data(country, city)
+        city_data = get_city_data(self.country, self.city)
         if city_data is None:
-            raise InvalidInputError(f"无法找到国家 '{country}' 城市 '{city}' 的数据")
+            raise InvalidInputError(f"无法找到国家 '{self.country}' 城市 '{self.city}' 的数据")
+        
+        currency_symbol = get_currency_symbol(city_data.currency)
+        set_attr(self, 'city_data', city_data)
+        set_attr(self, 'currency', city_data.currency)
+        set_attr(self, 'currency_symbol', currency_symbol)
+        set_attr(self, 'data_sources', city_data.sources)
         
-        self.city_data = city_data
-        self.currency = city_data.currency
-        self.currency_symbol = get_currency_symbol(city_data.currency)
-        self.data_sources = city_data.sources
+        # 现金流表格列名（使用动态货币符号）
+        set_attr(self, '_col_income', f"月收入（{currency_symbol}）")
+        set_attr(self, '_col_expense', f"月支出（{currency_symbol}）")
+        set_attr(self, '_col_balance', f"累计余额（{currency_symbol}）")
         
         # 获取房租
-        rent = get_rent_by_type(country, city, rent_type)
+        rent = get_rent_by_type(self.country, self.city, self.rent_type)
         if rent is None:
-            raise InvalidInputError(f"无法找到 '{rent_type}' 类型的房租数据")
+            raise InvalidInputError(f"无法找到 '{self.rent_type}' 类型的房租数据")
         
-        self.monthly_rent = rent
-        self.monthly_living_cost = city_data.living_cost
+        set_attr(self, 'monthly_rent', rent)
+        set_attr(self, 'monthly_living_cost', city_data.living_cost)
         
         # 计算月收入
-        self.monthly_income = self._calculate_monthly_income()
+        set_attr(self, 'monthly_income', self._calculate_monthly_income())
         
         # 计算学费分摊
-        self.tuition_monthly = self._calculate_tuition_monthly()
+        set_attr(self, 'tuition_monthly', self._calculate_tuition_monthly())
+        
+        # 每月学费支出安排
+        set_attr(self, '_tuition_by_month', self._build_tuition_schedule())
+    
+    @classmethod
+    @lru_cache(maxsize=128)
+    def build(cls,
+              country: str,
+              city: str,
+              rent_type: str,
+              has_job: bool,
+              weekly_hours: float,
+              hourly_wage: float,
+              initial_deposit: float,
+              tuition_total: float,
+              tuition_payment: str) -> "StudyCostCalculator":
+        """
+        创建计算器（按输入参数缓存，相同输入直接复用已计算的实例）
+        
+        异常:
+            InvalidInputError: 输入无效时抛出（不会被缓存）
+        """
+        return cls(country, city, rent_type, has_job, weekly_hours, hourly_wage,
+                   initial_deposit, tuition_total, tuition_payment)
     
     def _validate_inputs(self, country: str, city: str, rent_type: str, weekly_hours: float,
                         hourly_wage: float, initial_deposit: float, tuition_total: float, 
@@ -115,21 +206,19 @@ class StudyCostCalculator:
             InvalidInputError: 输入无效时抛出
         """
         # 验证国家
-        available_countries = get_countries()
-        if country not in available_countries:
+        if country not in get_country_set():
             raise InvalidInputError(
-                f"不支持的国家: '{country}'。支持的国家: {', '.join(available_countries)}"
+                f"不支持的国家: '{country}'。支持的国家: {', '.join(get_countries())}"
             )
         
         # 验证城市
-        available_cities = get_cities(country)
-        if city not in available_cities:
+        if city not in get_city_set(country):
             raise InvalidInputError(
-                f"不支持的城市: '{city}'。{country}支持的城市: {', '.join(available_cities)}"
+                f"不支持的城市: '{city}'。{country}支持的城市: {', '.join(get_cities(country))}"
             )
         
         # 验证房租类型
-        if rent_type not in ["单间", "合租", "宿舍"]:
+        if rent_type not in _RENT_TYPES:
             raise InvalidInputError(
                 f"不支持的房租类型: '{rent_type}'。支持的类型: 单间, 合租, 宿舍"
             )
@@ -151,7 +240,7 @@ class StudyCostCalculator:
             raise InvalidInputError("小时工资不能为负数")
         
         # 验证学费支付方式
-        if tuition_payment not in ["一次性", "分期"]:
+        if tuition_payment not in _TUITION_PAYMENTS:
             raise InvalidInputError(f"不支持的学费支付方式: '{tuition_payment}'。支持的方式: 一次性, 分期")
     
     def _calculate_monthly_income(self) -> float:
@@ -171,86 +260,70 @@ class StudyCostCalculator:
         else:
             return 0.0
     
-    def calculate_cashflow(self) -> pd.DataFrame:
+    def _build_tuition_schedule(self) -> np.ndarray:
+        """生成12个月的学费支出向量"""
+        schedule = np.zeros(12)
+        if self.tuition_payment == "一次性":  # 9月一次性支付
+            schedule[0] = self.tuition_total
+        elif self.tuition_payment == "分期":  # 9月到6月分期支付
+            schedule[:self.TUITION_PAYMENT_MONTHS] = self.tuition_monthly
+        return schedule
+    
+    def calculate_cashflow(self) -> Cashflow:
         """
         计算12个月的现金流
         
         返回:
-            包含月份、收入、支出、余额的DataFrame
-            
-        异常:
-            CalculationError: 计算出错时抛出
+            包含月份、收入、支出、余额的Cashflow
         """
-        try:
-            months = []
-            incomes = []
-            expenses = []
-            balances = []
-            cumulative_balance = self.initial_deposit
-            
-            # 生成12个月的数据（从9月开始，假设是学年开始）
-            month_names = ["9月", "10月", "11月", "12月", "1月", "2月", 
-                          "3月", "4月", "5月", "6月", "7月", "8月"]
-            
-            for i, month_name in enumerate(month_names):
-                # 月收入
-                income = self.monthly_income
-                
-                # 月支出
-                expense = self.monthly_rent + self.monthly_living_cost
-                
-                # 学费处理
-                if self.tuition_payment == "一次性" and i == 0:  # 9月一次性支付
-                    expense += self.tuition_total
-                elif self.tuition_payment == "分期" and i < self.TUITION_PAYMENT_MONTHS:  # 9月到6月分期支付
-                    expense += self.tuition_monthly
-                
-                # 计算余额
-                cumulative_balance = cumulative_balance + income - expense
-                
-                months.append(month_name)
-                incomes.append(round(income, 2))
-                expenses.append(round(expense, 2))
-                balances.append(round(cumulative_balance, 2))
-            
-            # 创建DataFrame（使用动态货币符号）
-            currency_col = f"（{self.currency_symbol}）"
-            df = pd.DataFrame({
-                "月份": months,
-                f"月收入{currency_col}": incomes,
-                f"月支出{currency_col}": expenses,
-                f"累计余额{currency_col}": balances
-            })
-            
-            return df
-        except Exception as e:
-            raise CalculationError(f"计算出错: {str(e)}")
+        if self._cashflow is not None:
+            return self._cashflow
+        
+        # 月收入、月支出（基础支出 + 学费）
+        incomes = np.full(12, self.monthly_income, dtype=float)
+        expenses = (self.monthly_rent + self.monthly_living_cost) + self._tuition_by_month
+        
+        # 计算累计余额
+        balances = self.initial_deposit + np.cumsum(incomes - expenses)
+        
+        incomes = np.round(incomes, 2)
+        expenses = np.round(expenses, 2)
+        balances = np.round(balances, 2)
+        
+        cashflow = Cashflow(
+            months=self.MONTH_NAMES,
+            income=incomes,
+            expense=expenses,
+            balance=balances,
+            columns=("月份", self._col_income, self._col_expense, self._col_balance)
+        )
+        object.__setattr__(self, '_cashflow', cashflow)
+        return cashflow
     
-    def find_critical_months(self, df: pd.DataFrame) -> Tuple[List[str], float]:
+    def find_critical_months(self, cashflow: Cashflow,
+                             min_balance: Optional[float] = None) -> Tuple[List[str], float]:
         """
         找出危险月份和需要补钱的金额（修复版）
         
         参数:
-            df: 现金流DataFrame
+            cashflow: 现金流计算结果
+            min_balance: 已算好的最低余额，传入时不再重复求最小值
             
         返回:
             (危险月份列表, 需要补钱的总额)
         """
-        try:
-            # 动态获取余额列名
-            balance_col = [col for col in df.columns if "累计余额" in col][0]
-            min_balance = df[balance_col].min()
-            
-            # 找出所有负余额的月份（修复：直接获取所有负余额月份，避免重复）
-            negative_months_df = df[df[balance_col] < 0]
-            critical_months = negative_months_df["月份"].tolist() if len(negative_months_df) > 0 else []
-            
-            # 计算需要补钱的总额（如果最低余额为负）
-            need_support = abs(min_balance) if min_balance < 0 else 0.0
-            
-            return critical_months, need_support
-        except Exception as e:
-            raise CalculationError(f"危险月份识别出错: {str(e)}")
+        balance = cashflow.balance
+        if min_balance is None:
+            min_balance = float(balance.min())
+        if min_balance >= 0:
+            return [], 0.0
+        
+        # 找出所有负余额的月份，需要补钱的总额为最低余额的绝对值
+        negative = balance < 0
+        critical_months = [cashflow.months[i] for i in np.flatnonzero(negative)]
+        need_support = -min_balance
+        
+        return critical_months, need_support
     
     def get_summary(self) -> Dict:
         """
@@ -262,14 +335,18 @@ class StudyCostCalculator:
         异常:
             CalculationError: 计算出错时抛出
         """
+        if self._summary is not None:
+            return self._summary
+        
         try:
-            df = self.calculate_cashflow()
-            critical_months, need_support = self.find_critical_months(df)
-            
-            # 动态获取余额列名
-            balance_col = [col for col in df.columns if "累计余额" in col][0]
+            cashflow = self.calculate_cashflow()
+            # 最低余额和最终余额只计算一次，后面复用
+            balance = cashflow.balance
+            min_balance = float(balance.min())
+            final_balance = float(balance[-1])
+            critical_months, need_support = self.find_critical_months(cashflow, min_balance)
             
-            return {
+            summary = {
                 "country": self.country,
                 "city": self.city,
                 "currency": self.currency,
@@ -277,25 +354,28 @@ class StudyCostCalculator:
                 "monthly_income": self.monthly_income,
                 "monthly_expense_base": self.monthly_rent + self.monthly_living_cost,
                 "tuition_monthly": self.tuition_monthly,
-                "final_balance": df[balance_col].iloc[-1],
-                "min_balance": df[balance_col].min(),
+                "final_balance": final_balance,
+                "min_balance": min_balance,
                 "critical_months": critical_months,
                 "need_support": need_support,
-                "cashflow_df": df,
+                "cashflow": cashflow,
                 "data_sources": self.data_sources,
                 "monthly_rent": self.monthly_rent,
                 "monthly_living_cost": self.monthly_living_cost
             }
         except Exception as e:
             raise CalculationError(f"摘要计算出错: {str(e)}")
+        
+        object.__setattr__(self, '_summary', summary)
+        return summary
     
     @classmethod
-    def get_available_countries(cls) -> List[str]:
+    def get_available_countries(cls) -> Sequence[str]:
         """获取支持的国家列表"""
         return get_countries()
     
     @classmethod
-    def get_available_cities(cls, country: str) -> List[str]:
+    def get_available_cities(cls, country: str) -> Sequence[str]:
         """获取指定国家支持的城市列表"""
         return get_cities(country)
 
@@ -3,608 +3,231 @@
 
 包含主流留学国家和城市的生活成本数据，每项数据都有来源依据。
 数据来源：Numbeo、Expatistan、各国官方统计数据等（2024年数据）
+数据本身保存在同目录的 cities.json 中，首次查询时才加载。
+
+数据库是封闭的静态集合，各查询函数用不限大小的 functools.cache 缓存结果；
+如需重新加载数据文件，先调用 clear_caches()。
 """
 
-from typing import Dict, List, Optional
+import json
+import sys
+from array import array
+from functools import cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping, Optional, Sequence, Tuple
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CostData:
-    """生活成本数据类"""
-    rent_single: float  # 单间月租（当地货币）
-    rent_shared: float  # 合租月租（当地货币）
-    rent_dorm: float  # 宿舍月租（当地货币）
+    """生活成本数据类（不可变，数据库中的实例在各处共享）"""
+    rents: Tuple[float, float, float]  # (单间, 合租, 宿舍) 月租（当地货币），下标见 _RENT_IDX
     living_cost: float  # 月生活费（当地货币）
     currency: str  # 货币代码
-    sources: List[str]  # 数据来源
-
-
-# 全球城市生活成本数据库
-GLOBAL_CITY_DATABASE = {
-    "葡萄牙": {
-        "里斯本": CostData(
-            rent_single=400,
-            rent_shared=250,
-            rent_dorm=300,
-            living_cost=350,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Lisbon",
-                "葡萄牙国家统计局 - 2024年住房成本报告",
-                "Expatistan - Lisbon Living Costs"
-            ]
-        ),
-        "波尔图": CostData(
-            rent_single=350,
-            rent_shared=220,
-            rent_dorm=280,
-            living_cost=320,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Porto",
-                "葡萄牙国家统计局 - 2024年住房成本报告"
-            ]
-        ),
-        "科英布拉": CostData(
-            rent_single=300,
-            rent_shared=200,
-            rent_dorm=250,
-            living_cost=280,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Coimbra",
-                "科英布拉大学官方数据"
-            ]
-        ),
-        "阿威罗": CostData(
-            rent_single=320,
-            rent_shared=200,
-            rent_dorm=260,
-            living_cost=290,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Aveiro",
-                "葡萄牙国家统计局 - 2024年住房成本报告",
-                "阿威罗大学官方数据"
-            ]
-        )
-    },
-    "英国": {
-        "伦敦": CostData(
-            rent_single=1200,
-            rent_shared=800,
-            rent_dorm=900,
-            living_cost=1000,
-            currency="GBP",
-            sources=[
-                "Numbeo 2024 - Cost of Living in London",
-                "英国国家统计局 - 2024年住房成本",
-                "Expatistan - London Living Costs",
-                "Rightmove - 2024年租金报告"
-            ]
-        ),
-        "曼彻斯特": CostData(
-            rent_single=600,
-            rent_shared=400,
-            rent_dorm=500,
-            living_cost=600,
-            currency="GBP",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Manchester",
-                "曼彻斯特大学官方数据"
-            ]
-        ),
-        "爱丁堡": CostData(
-            rent_single=700,
-            rent_shared=500,
-            rent_dorm=600,
-            living_cost=650,
-            currency="GBP",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Edinburgh",
-                "爱丁堡大学官方数据"
-            ]
-        ),
-        "伯明翰": CostData(
-            rent_single=550,
-            rent_shared=380,
-            rent_dorm=450,
-            living_cost=550,
-            currency="GBP",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Birmingham",
-                "伯明翰大学官方数据"
-            ]
-        )
-    },
-    "美国": {
-        "纽约": CostData(
-            rent_single=2500,
-            rent_shared=1500,
-            rent_dorm=1800,
-            living_cost=1200,
-            currency="USD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in New York",
-                "美国劳工统计局 - 2024年生活成本数据",
-                "Zillow - 2024年纽约租金报告",
-                "Expatistan - New York Living Costs"
-            ]
-        ),
-        "洛杉矶": CostData(
-            rent_single=2200,
-            rent_shared=1300,
-            rent_dorm=1600,
-            living_cost=1100,
-            currency="USD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Los Angeles",
-                "美国劳工统计局 - 2024年生活成本数据",
-                "Zillow - 2024年洛杉矶租金报告"
-            ]
-        ),
-        "波士顿": CostData(
-            rent_single=2000,
-            rent_shared=1200,
-            rent_dorm=1500,
-            living_cost=1000,
-            currency="USD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Boston",
-                "波士顿大学官方数据",
-                "Zillow - 2024年波士顿租金报告"
-            ]
-        ),
-        "芝加哥": CostData(
-            rent_single=1500,
-            rent_shared=900,
-            rent_dorm=1100,
-            living_cost=900,
-            currency="USD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Chicago",
-                "芝加哥大学官方数据"
-            ]
-        ),
-        "旧金山": CostData(
-            rent_single=2800,
-            rent_shared=1700,
-            rent_dorm=2000,
-            living_cost=1300,
-            currency="USD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in San Francisco",
-                "Zillow - 2024年旧金山租金报告"
-            ]
-        )
-    },
-    "加拿大": {
-        "多伦多": CostData(
-            rent_single=1800,
-            rent_shared=1100,
-            rent_dorm=1400,
-            living_cost=900,
-            currency="CAD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Toronto",
-                "加拿大统计局 - 2024年住房成本",
-                "Expatistan - Toronto Living Costs"
-            ]
-        ),
-        "温哥华": CostData(
-            rent_single=2000,
-            rent_shared=1200,
-            rent_dorm=1500,
-            living_cost=950,
-            currency="CAD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Vancouver",
-                "加拿大统计局 - 2024年住房成本"
-            ]
-        ),
-        "蒙特利尔": CostData(
-            rent_single=1200,
-            rent_shared=700,
-            rent_dorm=900,
-            living_cost=750,
-            currency="CAD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Montreal",
-                "麦吉尔大学官方数据"
-            ]
-        )
-    },
-    "澳大利亚": {
-        "悉尼": CostData(
-            rent_single=2000,
-            rent_shared=1200,
-            rent_dorm=1500,
-            living_cost=1200,
-            currency="AUD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Sydney",
-                "澳大利亚统计局 - 2024年生活成本",
-                "Expatistan - Sydney Living Costs"
-            ]
-        ),
-        "墨尔本": CostData(
-            rent_single=1600,
-            rent_shared=950,
-            rent_dorm=1200,
-            living_cost=1000,
-            currency="AUD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Melbourne",
-                "澳大利亚统计局 - 2024年生活成本"
-            ]
-        ),
-        "布里斯班": CostData(
-            rent_single=1400,
-            rent_shared=850,
-            rent_dorm=1100,
-            living_cost=900,
-            currency="AUD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Brisbane",
-                "昆士兰大学官方数据"
-            ]
-        )
-    },
-    "德国": {
-        "柏林": CostData(
-            rent_single=800,
-            rent_shared=500,
-            rent_dorm=600,
-            living_cost=600,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Berlin",
-                "德国联邦统计局 - 2024年住房成本",
-                "Expatistan - Berlin Living Costs"
-            ]
-        ),
-        "慕尼黑": CostData(
-            rent_single=1000,
-            rent_shared=650,
-            rent_dorm=750,
-            living_cost=700,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Munich",
-                "德国联邦统计局 - 2024年住房成本"
-            ]
-        ),
-        "汉堡": CostData(
-            rent_single=750,
-            rent_shared=480,
-            rent_dorm=580,
-            living_cost=580,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Hamburg",
-                "汉堡大学官方数据"
-            ]
-        )
-    },
-    "法国": {
-        "巴黎": CostData(
-            rent_single=900,
-            rent_shared=600,
-            rent_dorm=700,
-            living_cost=700,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Paris",
-                "法国国家统计局 - 2024年住房成本",
-                "Expatistan - Paris Living Costs"
-            ]
-        ),
-        "里昂": CostData(
-            rent_single=600,
-            rent_shared=400,
-            rent_dorm=500,
-            living_cost=550,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Lyon",
-                "里昂大学官方数据"
-            ]
-        )
-    },
-    "意大利": {
-        "罗马": CostData(
-            rent_single=700,
-            rent_shared=450,
-            rent_dorm=550,
-            living_cost=600,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Rome",
-                "意大利国家统计局 - 2024年住房成本"
-            ]
-        ),
-        "米兰": CostData(
-            rent_single=800,
-            rent_shared=500,
-            rent_dorm=600,
-            living_cost=650,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Milan",
-                "米兰大学官方数据"
-            ]
-        )
-    },
-    "西班牙": {
-        "马德里": CostData(
-            rent_single=700,
-            rent_shared=450,
-            rent_dorm=550,
-            living_cost=600,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Madrid",
-                "西班牙国家统计局 - 2024年住房成本",
-                "Expatistan - Madrid Living Costs"
-            ]
-        ),
-        "巴塞罗那": CostData(
-            rent_single=750,
-            rent_shared=480,
-            rent_dorm=580,
-            living_cost=620,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Barcelona",
-                "西班牙国家统计局 - 2024年住房成本"
-            ]
-        )
-    },
-    "荷兰": {
-        "阿姆斯特丹": CostData(
-            rent_single=1200,
-            rent_shared=750,
-            rent_dorm=900,
-            living_cost=700,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Amsterdam",
-                "荷兰中央统计局 - 2024年住房成本",
-                "Expatistan - Amsterdam Living Costs"
-            ]
-        ),
-        "鹿特丹": CostData(
-            rent_single=900,
-            rent_shared=600,
-            rent_dorm=700,
-            living_cost=650,
-            currency="EUR",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Rotterdam",
-                "鹿特丹大学官方数据"
-            ]
-        )
-    },
-    "日本": {
-        "东京": CostData(
-            rent_single=90000,
-            rent_shared=60000,
-            rent_dorm=75000,
-            living_cost=80000,
-            currency="JPY",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Tokyo",
-                "日本总务省统计局 - 2024年生活成本",
-                "Expatistan - Tokyo Living Costs"
-            ]
-        ),
-        "大阪": CostData(
-            rent_single=70000,
-            rent_shared=45000,
-            rent_dorm=60000,
-            living_cost=65000,
-            currency="JPY",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Osaka",
-                "日本总务省统计局 - 2024年生活成本"
-            ]
-        ),
-        "京都": CostData(
-            rent_single=65000,
-            rent_shared=40000,
-            rent_dorm=55000,
-            living_cost=60000,
-            currency="JPY",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Kyoto",
-                "京都大学官方数据"
-            ]
-        )
-    },
-    "韩国": {
-        "首尔": CostData(
-            rent_single=800000,
-            rent_shared=500000,
-            rent_dorm=650000,
-            living_cost=700000,
-            currency="KRW",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Seoul",
-                "韩国统计厅 - 2024年生活成本",
-                "Expatistan - Seoul Living Costs"
-            ]
-        ),
-        "釜山": CostData(
-            rent_single=600000,
-            rent_shared=380000,
-            rent_dorm=500000,
-            living_cost=550000,
-            currency="KRW",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Busan",
-                "釜山大学官方数据"
-            ]
-        )
-    },
-    "新加坡": {
-        "新加坡": CostData(
-            rent_single=1500,
-            rent_shared=900,
-            rent_dorm=1100,
-            living_cost=800,
-            currency="SGD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Singapore",
-                "新加坡统计局 - 2024年生活成本",
-                "Expatistan - Singapore Living Costs"
-            ]
-        )
-    },
-    "新西兰": {
-        "奥克兰": CostData(
-            rent_single=1500,
-            rent_shared=900,
-            rent_dorm=1100,
-            living_cost=1000,
-            currency="NZD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Auckland",
-                "新西兰统计局 - 2024年住房成本"
-            ]
-        ),
-        "惠灵顿": CostData(
-            rent_single=1400,
-            rent_shared=850,
-            rent_dorm=1050,
-            living_cost=950,
-            currency="NZD",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Wellington",
-                "新西兰统计局 - 2024年住房成本"
-            ]
-        )
-    },
-    "瑞士": {
-        "苏黎世": CostData(
-            rent_single=1500,
-            rent_shared=1000,
-            rent_dorm=1200,
-            living_cost=1000,
-            currency="CHF",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Zurich",
-                "瑞士联邦统计局 - 2024年生活成本",
-                "Expatistan - Zurich Living Costs"
-            ]
-        ),
-        "日内瓦": CostData(
-            rent_single=1600,
-            rent_shared=1100,
-            rent_dorm=1300,
-            living_cost=1050,
-            currency="CHF",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Geneva",
-                "瑞士联邦统计局 - 2024年生活成本"
-            ]
-        )
-    },
-    "瑞典": {
-        "斯德哥尔摩": CostData(
-            rent_single=900,
-            rent_shared=600,
-            rent_dorm=700,
-            living_cost=700,
-            currency="SEK",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Stockholm",
-                "瑞典统计局 - 2024年住房成本"
-            ]
-        )
-    },
-    "丹麦": {
-        "哥本哈根": CostData(
-            rent_single=1000,
-            rent_shared=650,
-            rent_dorm=800,
-            living_cost=800,
-            currency="DKK",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Copenhagen",
-                "丹麦统计局 - 2024年住房成本",
-                "Expatistan - Copenhagen Living Costs"
-            ]
-        )
-    },
-    "挪威": {
-        "奥斯陆": CostData(
-            rent_single=1100,
-            rent_shared=700,
-            rent_dorm=850,
-            living_cost=900,
-            currency="NOK",
-            sources=[
-                "Numbeo 2024 - Cost of Living in Oslo",
-                "挪威统计局 - 2024年住房成本"
-            ]
-        )
-    }
+    source_ids: bytes  # 数据来源编号（uint16 数组的字节表示，对应 _db().source_table）
+
+    @property
+    def rent_single(self) -> float:
+        """单间月租（当地货币）"""
+        return self.rents[0]
+
+    @property
+    def rent_shared(self) -> float:
+        """合租月租（当地货币）"""
+        return self.rents[1]
+
+    @property
+    def rent_dorm(self) -> float:
+        """宿舍月租（当地货币）"""
+        return self.rents[2]
+
+    @property
+    def sources(self) -> Tuple[str, ...]:
+        """数据来源（按编号从来源表中还原）"""
+        table = _db().source_table
+        return tuple(table[i] for i in array("H", self.source_ids))
+
+
+# 住宿类型 -> CostData.rents 中的下标
+_RENT_IDX: Dict[str, int] = {
+    "单间": 0,
+    "合租": 1,
+    "宿舍": 2
+}
+
+# 货币代码 -> 货币符号
+_CURRENCY_SYMBOLS: Dict[str, str] = {
+    "EUR": "€",
+    "GBP": "£",
+    "USD": "$",
+    "CAD": "C$",
+    "AUD": "A$",
+    "JPY": "¥",
+    "KRW": "₩",
+    "SGD": "S$",
+    "NZD": "NZ$",
+    "CHF": "CHF",
+    "SEK": "kr",
+    "DKK": "kr",
+    "NOK": "kr"
 }
 
 
-def get_countries() -> List[str]:
-    """获取所有支持的国家列表"""
-    return sorted(GLOBAL_CITY_DATABASE.keys())
+# 城市卡片视图：(货币符号, 单间月租, 合租月租, 宿舍月租, 月生活费)
+CityView = Tuple[str, float, float, float, float]
+
+# 城市生活成本数据文件（与本模块放在同一目录，首次查询时才解析）
+_DATA_FILE = Path(__file__).with_name("cities.json")
 
 
-def get_cities(country: str) -> List[str]:
-    """获取指定国家的城市列表"""
-    if country not in GLOBAL_CITY_DATABASE:
-        return []
-    return sorted(GLOBAL_CITY_DATABASE[country].keys())
+@dataclass(slots=True, frozen=True)
+class _CityIndex:
+    """加载后的城市数据及其派生索引"""
+    nested: Mapping[str, Mapping[str, CostData]]  # 国家 -> 城市 -> 数据（只读）
+    flat: Dict[Tuple[str, str], CostData]  # 按 (国家, 城市) 展平的索引
+    countries: Tuple[str, ...]  # 排好序的国家列表
+    cities: Dict[str, Tuple[str, ...]]  # 国家 -> 排好序的城市列表
+    view: Dict[Tuple[str, str], CityView]  # (国家, 城市) -> 城市卡片所需字段
+    names: Dict[str, str]  # 国家/城市名 -> 驻留后的同一字符串对象
+    source_table: Tuple[str, ...]  # 来源编号 -> 来源文本，每条来源只存一份
 
 
+@cache
+def _db() -> _CityIndex:
+    """
+    读取数据文件并构建全部索引（只在第一次调用时执行）
+    
+    返回:
+        城市数据索引
+    """
+    with open(_DATA_FILE, encoding="utf-8") as f:
+        raw = json.load(f)
+    
+    # 来源文本在不同城市间大量重复，统一编号后每个城市只保存编号
+    source_ids: Dict[str, int] = {}
+    
+    def make_cost_data(fields: dict) -> CostData:
+        ids = array("H", (source_ids.setdefault(s, len(source_ids)) for s in fields.pop("sources")))
+        rents = (fields.pop("rent_single"), fields.pop("rent_shared"), fields.pop("rent_dorm"))
+        return CostData(rents=rents, **fields, source_ids=ids.tobytes())
+    
+    # 国家和城市名驻留后作为键，热路径上的比较可以直接按对象身份命中
+    nested = {
+        sys.intern(country): {
+            sys.intern(city): make_cost_data(fields) for city, fields in cities.items()
+        }
+        for country, cities in raw.items()
+    }
+    flat = {
+        (country, city): data
+        for country, cities in nested.items()
+        for city, data in cities.items()
+    }
+    return _CityIndex(
+        # 对外暴露的嵌套结构用只读代理包装，配合冻结的 CostData 整棵树都不可变
+        nested=MappingProxyType({
+            country: MappingProxyType(cities) for country, cities in nested.items()
+        }),
+        flat=flat,
+        # 数据库是静态的，排序结果在这里算一次即可
+        countries=tuple(sorted(nested)),
+        cities={country: tuple(sorted(cities)) for country, cities in nested.items()},
+        view={
+            key: (
+                _CURRENCY_SYMBOLS.get(data.currency, data.currency),
+                data.rent_single,
+                data.rent_shared,
+                data.rent_dorm,
+                data.living_cost
+            )
+            for key, data in flat.items()
+        },
+        names={name: name for key in flat for name in key},
+        source_table=tuple(source_ids)
+    )
+
+
+def __getattr__(name: str):
+    # 兼容旧代码直接访问 GLOBAL_CITY_DATABASE，访问时才加载数据
+    if name == "GLOBAL_CITY_DATABASE":
+        return _db().nested
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def clear_caches() -> None:
+    """清空数据加载和各查询函数的缓存（重新加载 cities.json 前调用）"""
+    for func in (_db, get_cities, get_country_set, get_city_set,
+                 get_city_data, _rent_cached, get_currency_symbol):
+        func.cache_clear()
+
+
+def get_countries() -> Sequence[str]:
+    """获取所有支持的国家列表（已排序的共享元组，不可变；需要修改时请 list() 复制）"""
+    return _db().countries
+
+
+@cache
+def get_cities(country: str) -> Sequence[str]:
+    """获取指定国家的城市列表（已排序的共享元组，不可变；需要修改时请 list() 复制）"""
+    return _db().cities.get(country, ())
+
+
+@cache
+def get_country_set() -> FrozenSet[str]:
+    """获取所有支持的国家集合（用于输入校验）"""
+    return frozenset(_db().nested)
+
+
+@cache
+def get_city_set(country: str) -> FrozenSet[str]:
+    """获取指定国家的城市集合（用于输入校验）"""
+    return frozenset(_db().nested.get(country, ()))
+
+
+@cache
 def get_city_data(country: str, city: str) -> Optional[CostData]:
     """获取城市生活成本数据"""
-    if country not in GLOBAL_CITY_DATABASE:
-        return None
-    if city not in GLOBAL_CITY_DATABASE[country]:
-        return None
-    return GLOBAL_CITY_DATABASE[country][city]
+    return _db().flat.get((country, city))
 
 
-def get_rent_by_type(country: str, city: str, rent_type: str) -> Optional[float]:
-    """根据住宿类型获取房租"""
-    data = get_city_data(country, city)
-    if data is None:
-        return None
+def canonicalize(country: str, city: str) -> Tuple[str, str]:
+    """
+    把国家/城市名换成数据库中驻留的同一字符串对象
     
-    rent_mapping = {
-        "单间": data.rent_single,
-        "合租": data.rent_shared,
-        "宿舍": data.rent_dorm
-    }
+    同一请求里反复查询时可以复用缓存好的哈希；未知名称原样返回。
     
-    return rent_mapping.get(rent_type)
+    参数:
+        country: 国家名称
+        city: 城市名称
+        
+    返回:
+        (国家, 城市)
+    """
+    names = _db().names
+    return names.get(country, country), names.get(city, city)
+
+
+def get_city_view(country: str, city: str) -> Optional[CityView]:
+    """获取城市卡片视图（货币符号、三种房租和生活费），一次查找即可拿全"""
+    return _db().view.get((country, city))
+
+
+@cache
+def _rent_cached(country: str, city: str, rent_type: str) -> Optional[float]:
+    """按 (国家, 城市, 住宿类型) 缓存的房租解析：一次查找加一次元组下标"""
+    idx = _RENT_IDX.get(rent_type)
+    data = _db().flat.get((country, city))
+    return data.rents[idx] if (data is not None and idx is not None) else None
 
 
+def get_rent_by_type(country: str, city: str, rent_type: str) -> Optional[float]:
+    """根据住宿类型获取房租"""
+    return _rent_cached(country, city, rent_type)
+
+
+@cache
 def get_currency_symbol(currency_code: str) -> str:
     """获取货币符号"""
-    currency_symbols = {
-        "EUR": "€",
-        "GBP": "£",
-        "USD": "$",
-        "CAD": "C$",
-        "AUD": "A$",
-        "JPY": "¥",
-        "KRW": "₩",
-        "SGD": "S$",
-        "NZD": "NZ$",
-        "CHF": "CHF",
-        "SEK": "kr",
-        "DKK": "kr",
-        "NOK": "kr"
-    }
-    return currency_symbols.get(currency_code, currency_code)
+    return _CURRENCY_SYMBOLS.get(currency_code, currency_code)
 
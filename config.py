@@ -4,30 +4,36 @@
 存储应用配置信息
 """
 
+from types import SimpleNamespace
+
 # 免费用户限制
 FREE_MONTHLY_LIMIT = 3
 
-# 订阅计划
+# 各付费计划的常用字段，热路径直接读属性（如 PRO_MONTHLY.price）
+PRO_MONTHLY = SimpleNamespace(
+    name='专业版（月付）',
+    price=29,
+    period='month',
+    duration_days=30
+)
+PRO_YEARLY = SimpleNamespace(
+    name='专业版（年付）',
+    price=299,
+    period='year',
+    duration_days=365,
+    original_price=348,
+    discount='14%'
+)
+
+# 订阅计划（按计划ID查找时使用，内容与上面的常量一致）
 SUBSCRIPTION_PLANS = {
     'free': {
         'name': '免费版',
         'price': 0,
-        'monthly_limit': 3
-    },
-    'pro_monthly': {
-        'name': '专业版（月付）',
-        'price': 29,
-        'period': 'month',
-        'duration_days': 30
+        'monthly_limit': FREE_MONTHLY_LIMIT
     },
-    'pro_yearly': {
-        'name': '专业版（年付）',
-        'price': 299,
-        'period': 'year',
-        'duration_days': 365,
-        'original_price': 348,
-        'discount': '14%'
-    }
+    'pro_monthly': dict(vars(PRO_MONTHLY)),
+    'pro_yearly': dict(vars(PRO_YEARLY))
 }
 
 # 数据库配置
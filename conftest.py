@@ -0,0 +1,22 @@
+"""
+pytest配置
+
+test_all_features.py 中的测试函数通过 db 参数获得测试数据库：
+整个测试会话共用一个SQLite内存数据库，每个测试结束后回滚到测试前的状态。
+"""
+
+import pytest
+from database import Database
+
+
+@pytest.fixture(scope="session")
+def session_db():
+    """整个测试会话共用的内存数据库（不读写磁盘上的 app.db）"""
+    return Database.for_tests()
+
+
+@pytest.fixture
+def db(session_db):
+    """测试数据库：测试结束后回滚本测试的所有写入，测试之间互不影响"""
+    with session_db.rollback_after():
+        yield session_db
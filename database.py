@@ -8,15 +8,29 @@
 """
 
 import os
+import queue
+import re
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, Iterator, List, Tuple, Union
 import json
 
 # 尝试导入数据库驱动
 try:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
+    import psycopg2.errors
+    import psycopg2.extensions
+    import psycopg2.pool
+    from psycopg2.extras import DictCursor, execute_values
     POSTGRESQL_AVAILABLE = True
+    
+    class _PgConnection(psycopg2.extensions.connection):
+        """带有“已准备语句”标记的PostgreSQL连接"""
+        prepared = False
 except ImportError:
     POSTGRESQL_AVAILABLE = False
 
@@ -26,6 +40,285 @@ try:
 except ImportError:
     SQLITE_AVAILABLE = False
 
+# 唯一约束冲突（如邮箱已注册）对应的异常类型
+_UNIQUE_VIOLATIONS: Tuple[type, ...] = ()
+if SQLITE_AVAILABLE:
+    _UNIQUE_VIOLATIONS += (sqlite3.IntegrityError,)
+if POSTGRESQL_AVAILABLE:
+    _UNIQUE_VIOLATIONS += (psycopg2.errors.UniqueViolation,)
+
+# orjson可选：安装后JSON序列化/解析更快，未安装时使用标准库json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+    _ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                       | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_default(obj):
+    """无法直接序列化的值：NumPy标量/数组转为Python数值，其余（如datetime）转为字符串"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def _json_dumps(obj) -> str:
+    """
+    序列化为紧凑的JSON文本（不转义非ASCII字符，无法序列化的值见 _json_default）
+    
+    是否安装orjson结果都一样：非字符串的键转为字符串，datetime和dataclass
+    不用orjson自带的格式，与标准库一样交给 _json_default 处理。
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_json_default, option=_ORJSON_OPTIONS).decode()
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+
+
+def _json_loads(text):
+    """解析JSON文本"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _expiry_timestamp(expires_at) -> Optional[float]:
+    """
+    把订阅过期时间转换为Unix时间戳（用户写入缓存时计算一次，订阅检查时只需比较数字）
+    
+    参数:
+        expires_at: SQLite中为ISO格式字符串，PostgreSQL中为datetime
+        
+    返回:
+        时间戳；没有过期时间或无法解析时返回None
+    """
+    if not expires_at:
+        return None
+    try:
+        if isinstance(expires_at, str):
+            expires_at = datetime.fromisoformat(expires_at)
+        return expires_at.timestamp()
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+# 用户查询缓存：(数据库标识, 'email'/'id', 邮箱或用户ID) -> (过期时间, 用户信息)
+# 所有Database实例共享，任一实例修改用户后清除缓存，其他实例也不会读到旧数据
+USER_CACHE_TTL = 60  # 秒
+USER_CACHE_MAXSIZE = 1024
+_user_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+# 月度使用次数缓存：(数据库标识, 用户ID, 年, 月) -> (过期时间, 次数)
+# save_calculation 用写入时返回的新计数直接更新，配额检查不必再查一次数据库
+_usage_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+# 用户查询只取业务需要的列（不含 created_at）
+_USER_COLUMNS = 'id, email, password_hash, subscription_type, subscription_expires_at, last_login'
+
+# 高频查询在每个PostgreSQL连接上只PREPARE一次，之后用 EXECUTE 调用，跳过重复的解析和规划
+_PG_PREPARED_STATEMENTS = {
+    'get_user_by_email': f'SELECT {_USER_COLUMNS} FROM users WHERE email = $1',
+    'get_user_by_id': f'SELECT {_USER_COLUMNS} FROM users WHERE id = $1',
+    'get_user_auth_row': 'SELECT id, password_hash FROM users WHERE email = $1',
+    'get_monthly_usage': (
+        'SELECT calculation_count FROM usage_stats '
+        'WHERE user_id = $1 AND year = $2 AND month = $3'
+    )
+}
+
+# 表结构（两种数据库共用），{pk} 等占位符按 _SCHEMA_DIALECTS 替换
+# SQLite 中 VARCHAR(n) 按 TEXT 处理，不限制长度
+SCHEMA = [
+    # 用户表
+    ('users', '''
+        CREATE TABLE IF NOT EXISTS users (
+            id {pk},
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            subscription_type VARCHAR(50) DEFAULT 'free',
+            subscription_expires_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP
+        )
+    '''),
+    # 计算记录表
+    ('calculations', '''
+        CREATE TABLE IF NOT EXISTS calculations (
+            id {pk},
+            user_id INTEGER,
+            country VARCHAR(100) NOT NULL,
+            city VARCHAR(100) NOT NULL,
+            inputs TEXT NOT NULL,
+            results TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    '''),
+    # 使用统计表
+    ('usage_stats', '''
+        CREATE TABLE IF NOT EXISTS usage_stats (
+            id {pk},
+            user_id INTEGER,
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            calculation_count INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            UNIQUE(user_id, year, month)
+        )
+    '''),
+    # 索引：历史记录按用户+时间倒序查询，月度使用按 (用户, 年, 月) 查询
+    # idx_calc_user_created 同时覆盖统计页按 (用户, 时间范围) 的查询，趋势统计无需回表
+    ('idx_calc_user_created', '''
+        CREATE INDEX IF NOT EXISTS idx_calc_user_created
+        ON calculations (user_id, created_at DESC)
+    '''),
+    ('idx_usage_user_ym', '''
+        CREATE INDEX IF NOT EXISTS idx_usage_user_ym
+        ON usage_stats (user_id, year, month){include_count}
+    ''')
+]
+
+_SCHEMA_DIALECTS = {
+    # INCLUDE 让 get_monthly_usage 只扫描索引即可取到计数
+    'postgresql': {'pk': 'SERIAL PRIMARY KEY', 'include_count': ' INCLUDE (calculation_count)'},
+    'sqlite': {'pk': 'INTEGER PRIMARY KEY AUTOINCREMENT', 'include_count': ''}
+}
+
+# 当前年、月由数据库计算（SQLite按本地时区，与原先的 datetime.now() 一致）
+_CURRENT_YEAR_MONTH = {
+    'postgresql': ('EXTRACT(YEAR FROM CURRENT_TIMESTAMP)::int',
+                   'EXTRACT(MONTH FROM CURRENT_TIMESTAMP)::int'),
+    'sqlite': ("CAST(strftime('%Y', 'now', 'localtime') AS INTEGER)",
+               "CAST(strftime('%m', 'now', 'localtime') AS INTEGER)")
+}
+
+# 其余语句模板，{ph} 替换为当前数据库的参数占位符，{year}/{month} 替换为当前年、月的表达式
+_SQL_TEMPLATES = {
+    'create_user': 'INSERT INTO users (email, password_hash) VALUES ({ph}, {ph})',
+    'update_login': 'UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = {ph}',
+    'update_subscription': (
+        'UPDATE users SET subscription_type = {ph}, subscription_expires_at = {ph} '
+        'WHERE id = {ph}'
+    ),
+    'insert_calculation': (
+        'INSERT INTO calculations (user_id, country, city, inputs, results) '
+        'VALUES ({ph}, {ph}, {ph}, {ph}, {ph})'
+    ),
+    'get_user_calculations': (
+        'SELECT * FROM calculations WHERE user_id = {ph} '
+        'ORDER BY created_at DESC LIMIT {ph}'
+    ),
+    'delete_calculation': 'DELETE FROM calculations WHERE id = {ph} AND user_id = {ph}',
+    'downgrade_expired': (
+        "UPDATE users SET subscription_type = 'free', subscription_expires_at = NULL "
+        "WHERE subscription_type != 'free' AND subscription_expires_at < {ph}"
+    ),
+    'upsert_usage': (
+        'INSERT INTO usage_stats (user_id, year, month, calculation_count) '
+        'VALUES ({ph}, {year}, {month}, 1) '
+        'ON CONFLICT(user_id, year, month) '
+        'DO UPDATE SET calculation_count = usage_stats.calculation_count + 1'
+    ),
+    # 批量保存时一次加上多条记录的次数
+    'add_usage': (
+        'INSERT INTO usage_stats (user_id, year, month, calculation_count) '
+        'VALUES ({ph}, {year}, {month}, {ph}) '
+        'ON CONFLICT(user_id, year, month) '
+        'DO UPDATE SET calculation_count = usage_stats.calculation_count + excluded.calculation_count'
+    ),
+    'get_current_usage': (
+        'SELECT calculation_count, year, month FROM usage_stats '
+        'WHERE user_id = {ph} AND year = {year} AND month = {month}'
+    ),
+    # 用户信息和本月使用次数一次查询取回（配额检查用）
+    'get_user_with_usage': (
+        'SELECT ' + ', '.join(f'u.{col}' for col in _USER_COLUMNS.split(', ')) + ', '
+        'COALESCE(s.calculation_count, 0) AS monthly_usage '
+        'FROM users u LEFT JOIN usage_stats s '
+        'ON s.user_id = u.id AND s.year = {year} AND s.month = {month} '
+        'WHERE u.id = {ph}'
+    )
+}
+
+# ? 占位符SQL -> PostgreSQL (%s) 写法，每条语句只转换一次
+_pg_sql_cache: Dict[str, str] = {}
+
+# SQLite 3.35 起支持 RETURNING，旧版本写入后再查询一次计数
+_SQLITE_HAS_RETURNING = SQLITE_AVAILABLE and sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# 批量按ID查询用户时每条语句最多的参数个数（SQLite旧版本限制为999个）
+IN_CLAUSE_CHUNK = 900
+
+# 流式读取计算历史时，PostgreSQL服务端游标每批取回的行数
+HISTORY_ITERSIZE = 100
+
+# 连接池按数据库（PostgreSQL连接串或SQLite文件的绝对路径）在进程内共享：
+# Streamlit每次重新运行脚本都会新建Database实例，但不会因此重新建立连接池和连接
+_pools: Dict[str, object] = {}
+_pools_lock = threading.Lock()
+
+# 内存数据库（测试用）：不落盘，进程结束即消失；每个连接池分配一个不重复的编号
+MEMORY_DB = ':memory:'
+_memory_db_ids = itertools.count(1)
+
+# SQLite驱动的语句缓存大小（相同SQL字符串复用已编译的语句）
+SQLITE_CACHED_STATEMENTS = 256
+
+# 每个SQLite物理连接打开时执行一次的PRAGMA
+# WAL模式下读写互不阻塞；synchronous=NORMAL 在WAL下不会损坏数据，只是减少fsync次数
+_SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',  # 64 MiB
+    'PRAGMA mmap_size=268435456',  # 256 MiB
+    'PRAGMA busy_timeout=5000'  # 并发写入时等待最多5秒，而不是直接报错
+)
+
+
+class _SQLiteConnectionPool:
+    """SQLite连接池（接口与psycopg2连接池的getconn/putconn一致）"""
+    
+    def __init__(self, db_path: str, maxconn: int = 10):
+        """
+        参数:
+            db_path: SQLite数据库文件路径
+            maxconn: 最多保留的空闲连接数
+        """
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=maxconn)
+        self._uri = False
+        self._keepalive = None
+        if db_path == MEMORY_DB:
+            # 池中各连接通过共享缓存访问同一个内存数据库；保留一个连接，使数据库在池的生命周期内一直存在
+            db_path = f'file:memdb{next(_memory_db_ids)}?mode=memory&cache=shared'
+            self._uri = True
+        self.db_path = db_path
+        if self._uri:
+            self._keepalive = self.getconn()
+    
+    def getconn(self):
+        """取出一个空闲连接，没有空闲连接时新建"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, uri=self._uri,
+                                   cached_statements=SQLITE_CACHED_STATEMENTS)
+            conn.row_factory = sqlite3.Row
+            for pragma in _SQLITE_PRAGMAS:
+                conn.execute(pragma)
+            return conn
+    
+    def putconn(self, conn):
+        """归还连接（未提交的事务会被回滚），空闲连接已满时直接关闭"""
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
 
 class Database:
     """数据库管理类（支持SQLite和PostgreSQL）"""
@@ -35,11 +328,84 @@ class Database:
         初始化数据库
         
         参数:
-            db_path: SQLite数据库文件路径（如果使用PostgreSQL则忽略）
+            db_path: SQLite数据库文件路径（如果使用PostgreSQL则忽略）；
+                     为 MEMORY_DB 时始终使用SQLite内存数据库（见 for_tests）
         """
         self.db_path = db_path
-        self.db_type = self._detect_db_type()
-        self.init_database()
+        self.db_type = 'sqlite' if db_path == MEMORY_DB else self._detect_db_type()
+        # 参数占位符和完整SQL只在初始化时确定一次，各方法直接使用，不再逐次判断数据库类型
+        self._ph = '%s' if self.db_type == 'postgresql' else '?'
+        self._sql = self._build_sql()
+        # 用户缓存按数据库区分，避免不同数据库文件之间串数据（内存数据库按连接池分配的URI区分）
+        if db_path == MEMORY_DB:
+            # 每个内存数据库都是独立的，连接池不共享
+            self._pool = self._create_pool()
+            self._cache_scope = self._pool.db_path
+            self.init_database()
+            return
+        
+        if self.db_type == 'postgresql':
+            self._cache_scope = os.getenv('DATABASE_URL')
+        else:
+            self._cache_scope = os.path.abspath(db_path)
+        with _pools_lock:
+            self._pool = _pools.get(self._cache_scope)
+            if self._pool is None:
+                # 首次连接该数据库：建立连接池并检查表结构，成功后才登记为共享
+                self._pool = self._create_pool()
+                self.init_database()
+                _pools[self._cache_scope] = self._pool
+    
+    @classmethod
+    def for_tests(cls) -> 'Database':
+        """
+        创建测试用的SQLite内存数据库（不读写磁盘，也不受 DATABASE_URL 影响）
+        
+        返回:
+            新的Database实例，每次调用都是一个独立的空数据库
+        """
+        return cls(MEMORY_DB)
+    
+    @property
+    def cache_scope(self) -> str:
+        """
+        数据库标识（PostgreSQL连接串、SQLite文件的绝对路径或内存数据库的URI）
+        
+        同一数据库的各个实例相同，可作为外部缓存（如 st.cache_data）的键，区分不同数据库。
+        """
+        return self._cache_scope
+    
+    @contextmanager
+    def rollback_after(self):
+        """
+        测试用：退出时把数据库回滚到进入时的状态（包括期间已提交的写入），并清除本数据库的查询缓存
+        
+        被测方法会自行提交事务，所以用SQLite的备份接口在进入时保存快照、退出时恢复，
+        而不是包在一个外层事务里。
+        
+        异常:
+            ValueError: 不是SQLite数据库
+        """
+        if self.db_type != 'sqlite':
+            raise ValueError("rollback_after 只支持SQLite数据库")
+        snapshot = sqlite3.connect(':memory:')
+        with self.connection() as conn:
+            conn.backup(snapshot)
+        try:
+            yield self
+        finally:
+            # 测试失败时同样回滚，不影响后面的测试
+            with self.connection() as conn:
+                snapshot.backup(conn)
+            snapshot.close()
+            self._clear_caches()
+    
+    def _clear_caches(self):
+        """清除本数据库的全部用户缓存和使用次数缓存"""
+        with _user_cache_lock:
+            for cache in (_user_cache, _usage_cache):
+                for key in [key for key in cache if key[0] == self._cache_scope]:
+                    del cache[key]
     
     def _detect_db_type(self) -> str:
         """检测使用的数据库类型"""
@@ -58,107 +424,212 @@ class Database:
         else:
             raise ImportError("需要安装数据库驱动: pip install psycopg2-binary 或使用Python内置sqlite3")
     
-    def get_connection(self):
-        """获取数据库连接"""
+    def _build_sql(self) -> Dict[str, str]:
+        """
+        生成当前数据库类型下各操作的完整SQL
+        
+        返回:
+            操作名 -> SQL语句
+        """
+        year, month = _CURRENT_YEAR_MONTH[self.db_type]
+        sql = {name: template.format(ph=self._ph, year=year, month=month)
+               for name, template in _SQL_TEMPLATES.items()}
+        for name, statement in _PG_PREPARED_STATEMENTS.items():
+            if self.db_type == 'postgresql':
+                # 调用连接上已准备好的语句
+                n_params = len(set(re.findall(r'\$\d+', statement)))
+                sql[name] = f"EXECUTE {name}({', '.join(['%s'] * n_params)})"
+            else:
+                sql[name] = re.sub(r'\$\d+', '?', statement)
         if self.db_type == 'postgresql':
-            database_url = os.getenv('DATABASE_URL')
-            conn = psycopg2.connect(database_url)
-            return conn
-        else:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            return conn
+            sql['create_user'] += ' RETURNING id'
+            # 插入记录和更新使用统计合并成一条语句（年、月表达式与 upsert_usage 相同）
+            sql['save_calculation'] = (
+                f"WITH ins AS ({sql['insert_calculation']} RETURNING id) "
+                f"{sql['upsert_usage']} RETURNING (SELECT id FROM ins), calculation_count, year, month"
+            )
+        return sql
     
-    def init_database(self):
-        """初始化数据库表"""
-        conn = self.get_connection()
-        c = conn.cursor()
-        
+    def _create_pool(self):
+        """创建持久连接池，避免每次操作都重新建立连接（由 __init__ 按数据库共享）"""
         if self.db_type == 'postgresql':
-            # PostgreSQL语法
-            # 用户表
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    email VARCHAR(255) UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    subscription_type VARCHAR(50) DEFAULT 'free',
-                    subscription_expires_at TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_login TIMESTAMP
-                )
-            ''')
+            return psycopg2.pool.ThreadedConnectionPool(
+                minconn=2, maxconn=20, dsn=os.getenv('DATABASE_URL'),
+                # DictCursor的行与sqlite3.Row一样既能按下标也能按列名访问，dict(row) 在两种数据库上通用
+                connection_factory=_PgConnection, cursor_factory=DictCursor
+            )
+        return _SQLiteConnectionPool(self.db_path)
+    
+    def get_connection(self, prepare: bool = True):
+        """
+        从连接池获取数据库连接
+        
+        一般使用 connection() 上下文管理器；直接获取时用完后必须调用 release_connection 归还，不要直接 close()。
+        
+        参数:
+            prepare: PostgreSQL连接首次取出时是否准备高频查询语句；
+                     init_database 建表前传False（语句引用的表可能还不存在），之后取出时再准备
+        """
+        conn = self._pool.getconn()
+        if prepare and self.db_type == 'postgresql' and not conn.prepared:
+            try:
+                self._prepare_statements(conn)
+            except BaseException:
+                # 准备失败时连接仍要归还连接池（未结束的事务由连接池回滚）
+                self._pool.putconn(conn)
+                raise
+        return conn
+    
+    def _prepare_statements(self, conn):
+        """在新的PostgreSQL连接上准备高频查询语句（每个连接只执行一次）"""
+        with conn.cursor() as c:
+            # 先清除上次失败时可能已准备的部分语句，重试时不会因同名语句已存在而报错
+            c.execute('DEALLOCATE ALL')
+            for name, sql in _PG_PREPARED_STATEMENTS.items():
+                c.execute(f'PREPARE {name} AS {sql}')
+        conn.commit()
+        conn.prepared = True
+    
+    def release_connection(self, conn):
+        """把连接归还到连接池"""
+        self._pool.putconn(conn)
+    
+    def adapt(self, sql: str) -> str:
+        """
+        把用 ? 占位符写的SQL转换为当前数据库的写法
+        
+        SQLite原样返回；PostgreSQL把 ? 换成 %s（并转义字面量 %），转换结果按语句缓存。
+        
+        参数:
+            sql: 使用 ? 占位符的SQL
             
-            # 计算记录表
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS calculations (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER,
-                    country VARCHAR(100) NOT NULL,
-                    city VARCHAR(100) NOT NULL,
-                    inputs TEXT NOT NULL,
-                    results TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
+        返回:
+            可直接执行的SQL
+        """
+        if self.db_type != 'postgresql':
+            return sql
+        adapted = _pg_sql_cache.get(sql)
+        if adapted is None:
+            adapted = _pg_sql_cache[sql] = sql.replace('%', '%%').replace('?', '%s')
+        return adapted
+    
+    def _get_cached_user(self, kind: str, value) -> Optional[Dict]:
+        """
+        从用户缓存中读取（过期的条目会被删除）
+        
+        参数:
+            kind: 'email' 或 'id'
+            value: 邮箱或用户ID
             
-            # 使用统计表
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS usage_stats (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER,
-                    year INTEGER NOT NULL,
-                    month INTEGER NOT NULL,
-                    calculation_count INTEGER DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users (id),
-                    UNIQUE(user_id, year, month)
-                )
-            ''')
-        else:
-            # SQLite语法
-            # 用户表
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    subscription_type TEXT DEFAULT 'free',
-                    subscription_expires_at TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_login TIMESTAMP
-                )
-            ''')
+        返回:
+            用户信息的副本，未命中返回None
+        """
+        key = (self._cache_scope, kind, value)
+        now = time.monotonic()
+        with _user_cache_lock:
+            entry = _user_cache.get(key)
+            if entry is None:
+                return None
+            expires, user = entry
+            if now >= expires:
+                del _user_cache[key]
+                return None
+            _user_cache.move_to_end(key)
+            return dict(user)
+    
+    def _cache_user(self, user: Dict) -> Dict:
+        """
+        把用户信息同时按邮箱和ID写入缓存
+        
+        同时计算订阅过期时间的时间戳（subscription_expires_ts），订阅检查不必每次解析日期。
+        
+        返回:
+            用户信息的副本（调用方修改它不会影响缓存）
+        """
+        user['subscription_expires_ts'] = _expiry_timestamp(user.get('subscription_expires_at'))
+        entry = (time.monotonic() + USER_CACHE_TTL, user)
+        with _user_cache_lock:
+            for key in ((self._cache_scope, 'email', user['email']),
+                        (self._cache_scope, 'id', user['id'])):
+                _user_cache[key] = entry
+                _user_cache.move_to_end(key)
+            while len(_user_cache) > USER_CACHE_MAXSIZE:
+                # 同一用户的邮箱键和ID键总是一起淘汰，保证邮箱键存在时ID键也在（invalidate_user 依赖这一点）
+                (scope, _, _), (_, evicted) = _user_cache.popitem(last=False)
+                _user_cache.pop((scope, 'email', evicted['email']), None)
+                _user_cache.pop((scope, 'id', evicted['id']), None)
+        return dict(user)
+    
+    def invalidate_user(self, user_id: int):
+        """
+        清除指定用户的查询缓存（用户信息在外部被修改后调用）
+        
+        参数:
+            user_id: 用户ID
+        """
+        with _user_cache_lock:
+            # 邮箱键只会与ID键同时存在（两者一起写入、一起淘汰），通过ID键即可找到邮箱键
+            entry = _user_cache.pop((self._cache_scope, 'id', user_id), None)
+            if entry is not None:
+                _user_cache.pop((self._cache_scope, 'email', entry[1]['email']), None)
+    
+    def _cache_usage(self, user_id: int, year: Optional[int], month: Optional[int], count: int):
+        """写入月度使用次数缓存（year/month 为None表示当前月）"""
+        key = (self._cache_scope, user_id, year, month)
+        with _user_cache_lock:
+            _usage_cache[key] = (time.monotonic() + USER_CACHE_TTL, count)
+            _usage_cache.move_to_end(key)
+            while len(_usage_cache) > USER_CACHE_MAXSIZE:
+                _usage_cache.popitem(last=False)
+    
+    @contextmanager
+    def connection(self, prepare: bool = True):
+        """
+        以上下文管理器方式使用连接池中的连接
+        
+        正常退出时提交，出现异常时回滚，最后都会把连接归还连接池::
+        
+            with self.connection() as conn:
+                c = conn.cursor()
+                ...
+        
+        参数:
+            prepare: 见 get_connection
+        """
+        conn = self.get_connection(prepare)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release_connection(conn)
+    
+    def init_database(self):
+        """
+        初始化数据库表和索引
+        
+        先用一条查询找出尚未创建的表/索引，只为缺少的对象执行DDL；
+        数据库已初始化时只需这一次查询。空数据库上表还不存在，所以这里使用
+        未准备语句的连接，连接下次取出时（表已创建）再准备。
+        """
+        dialect = _SCHEMA_DIALECTS[self.db_type]
+        with self.connection(prepare=False) as conn:
+            c = conn.cursor()
             
-            # 计算记录表
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS calculations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    country TEXT NOT NULL,
-                    city TEXT NOT NULL,
-                    inputs TEXT NOT NULL,
-                    results TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
+            names = [name for name, _ in SCHEMA]
+            if self.db_type == 'postgresql':
+                c.execute('SELECT relname FROM pg_class '
+                          'WHERE relname = ANY(%s) AND pg_table_is_visible(oid)', (names,))
+            else:
+                c.execute(f"SELECT name FROM sqlite_master WHERE name IN ({', '.join('?' * len(names))})",
+                          names)
+            existing = {row[0] for row in c.fetchall()}
             
-            # 使用统计表
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS usage_stats (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    year INTEGER NOT NULL,
-                    month INTEGER NOT NULL,
-                    calculation_count INTEGER DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users (id),
-                    UNIQUE(user_id, year, month)
-                )
-            ''')
-        
-        conn.commit()
-        conn.close()
+            for name, ddl in SCHEMA:
+                if name not in existing:
+                    c.execute(ddl.format(**dialect))
     
     def create_user(self, email: str, password_hash: str) -> Optional[int]:
         """
@@ -172,31 +643,14 @@ class Database:
             用户ID，如果失败返回None
         """
         try:
-            conn = self.get_connection()
-            c = conn.cursor()
-            
-            if self.db_type == 'postgresql':
-                c.execute('''
-                    INSERT INTO users (email, password_hash)
-                    VALUES (%s, %s)
-                    RETURNING id
-                ''', (email, password_hash))
-                user_id = c.fetchone()[0]
-            else:
-                c.execute('''
-                    INSERT INTO users (email, password_hash)
-                    VALUES (?, ?)
-                ''', (email, password_hash))
-                user_id = c.lastrowid
-            
-            conn.commit()
-            conn.close()
-            return user_id
-        except Exception as e:
-            # 处理唯一约束错误（邮箱已存在）
-            if 'unique' in str(e).lower() or 'duplicate' in str(e).lower():
-                return None
-            raise
+            with self.connection() as conn:
+                c = conn.cursor()
+                
+                c.execute(self._sql['create_user'], (email, password_hash))
+                return c.fetchone()[0] if self.db_type == 'postgresql' else c.lastrowid
+        except _UNIQUE_VIOLATIONS:
+            # 邮箱已存在
+            return None
     
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """
@@ -208,22 +662,69 @@ class Database:
         返回:
             用户信息字典，如果不存在返回None
         """
-        conn = self.get_connection()
-        c = conn.cursor()
+        cached = self._get_cached_user('email', email)
+        if cached is not None:
+            return cached
         
-        if self.db_type == 'postgresql':
-            c.execute('SELECT * FROM users WHERE email = %s', (email,))
+        with self.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute(self._sql['get_user_by_email'], (email,))
             row = c.fetchone()
-            if row:
-                return dict(row)
-        else:
-            c.execute('SELECT * FROM users WHERE email = ?', (email,))
+            return self._cache_user(dict(row)) if row else None
+    
+    def get_user_auth_row(self, email: str) -> Optional[Tuple[int, str]]:
+        """
+        获取登录校验所需的最少字段（只查询ID和密码哈希）
+        
+        参数:
+            email: 邮箱
+            
+        返回:
+            (用户ID, 密码哈希)，如果不存在返回None
+        """
+        cached = self._get_cached_user('email', email)
+        if cached is not None:
+            return cached['id'], cached['password_hash']
+        
+        with self.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute(self._sql['get_user_auth_row'], (email,))
             row = c.fetchone()
-            if row:
-                return dict(row)
+            return (row[0], row[1]) if row else None
+    
+    def authenticate_user(self, email: str, check_password: Callable[[str], bool]) -> Optional[int]:
+        """
+        校验登录并记录最后登录时间
         
-        conn.close()
-        return None
+        密码校验（scrypt，故意设计得很慢）在归还连接之后进行，不在校验期间占用连接池中的连接；
+        校验通过后再取一个连接更新登录时间。
+        
+        参数:
+            email: 邮箱
+            check_password: 接收密码哈希、返回是否匹配的校验函数
+            
+        返回:
+            校验通过返回用户ID，否则返回None（此时不会更新登录时间）
+        """
+        with self.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute(self._sql['get_user_auth_row'], (email,))
+            row = c.fetchone()
+        
+        if not row or not check_password(row[1]):
+            return None
+        
+        user_id = row[0]
+        with self.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute(self._sql['update_login'], (user_id,))
+        
+        self.invalidate_user(user_id)
+        return user_id
     
     def get_user_by_id(self, user_id: int) -> Optional[Dict]:
         """
@@ -235,34 +736,54 @@ class Database:
         返回:
             用户信息字典
         """
-        conn = self.get_connection()
-        c = conn.cursor()
+        cached = self._get_cached_user('id', user_id)
+        if cached is not None:
+            return cached
         
-        if self.db_type == 'postgresql':
-            c.execute('SELECT * FROM users WHERE id = %s', (user_id,))
-            row = c.fetchone()
-            if row:
-                return dict(row)
-        else:
-            c.execute('SELECT * FROM users WHERE id = ?', (user_id,))
+        with self.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute(self._sql['get_user_by_id'], (user_id,))
             row = c.fetchone()
-            if row:
-                return dict(row)
+            return self._cache_user(dict(row)) if row else None
+    
+    def get_users_by_ids(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """
+        批量获取用户（缓存未命中的用户用 IN 查询一次取回，并写入缓存）
         
-        conn.close()
-        return None
+        参数:
+            user_ids: 用户ID列表
+            
+        返回:
+            用户ID -> 用户信息字典，不存在的用户不包含在内
+        """
+        users = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = self._get_cached_user('id', user_id)
+            if cached is not None:
+                users[user_id] = cached
+            else:
+                missing.append(user_id)
+        
+        if missing:
+            with self.connection() as conn:
+                c = conn.cursor()
+                for start in range(0, len(missing), IN_CLAUSE_CHUNK):
+                    chunk = missing[start:start + IN_CLAUSE_CHUNK]
+                    placeholders = ', '.join([self._ph] * len(chunk))
+                    c.execute(f'SELECT {_USER_COLUMNS} FROM users WHERE id IN ({placeholders})', chunk)
+                    for row in c.fetchall():
+                        user = self._cache_user(dict(row))
+                        users[user['id']] = user
+        return users
     
     def update_user_login(self, user_id: int):
         """更新用户最后登录时间"""
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('''
-            UPDATE users 
-            SET last_login = CURRENT_TIMESTAMP 
-            WHERE id = ?
-        ''', (user_id,))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            c = conn.cursor()
+            c.execute(self._sql['update_login'], (user_id,))
+        self.invalidate_user(user_id)
     
     def update_subscription(self, user_id: int, subscription_type: str, expires_at: Optional[datetime] = None):
         """
@@ -273,28 +794,39 @@ class Database:
             subscription_type: 订阅类型（free/pro/monthly/yearly）
             expires_at: 过期时间
         """
-        conn = self.get_connection()
-        c = conn.cursor()
-        expires_str = expires_at.isoformat() if expires_at else None
-        if self.db_type == 'postgresql':
-            c.execute('''
-                UPDATE users 
-                SET subscription_type = %s, subscription_expires_at = %s
-                WHERE id = %s
-            ''', (subscription_type, expires_str, user_id))
-        else:
-            c.execute('''
-                UPDATE users 
-                SET subscription_type = ?, subscription_expires_at = ?
-                WHERE id = ?
-            ''', (subscription_type, expires_str, user_id))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            c = conn.cursor()
+            expires_str = expires_at.isoformat() if expires_at else None
+            c.execute(self._sql['update_subscription'], (subscription_type, expires_str, user_id))
+        self.invalidate_user(user_id)
+    
+    def downgrade_expired_subscriptions(self, now: datetime) -> int:
+        """
+        把已过期的付费订阅批量降级为免费版（一条UPDATE语句）
+        
+        参数:
+            now: 当前时间，过期时间早于它的订阅会被降级
+            
+        返回:
+            降级的用户数
+        """
+        with self.connection() as conn:
+            c = conn.cursor()
+            # 与 update_subscription 写入的格式一致（ISO格式字符串），SQLite中按字符串比较也正确
+            c.execute(self._sql['downgrade_expired'], (now.isoformat(),))
+            count = c.rowcount
+        
+        if count:
+            # 被降级的用户不止一个，直接清除本数据库的全部用户缓存
+            with _user_cache_lock:
+                for key in [key for key in _user_cache if key[0] == self._cache_scope]:
+                    del _user_cache[key]
+        return count
     
     def save_calculation(self, user_id: int, country: str, city: str, 
-                        inputs: Dict, results: Dict) -> int:
+                        inputs: Dict, results: Dict) -> Tuple[int, int]:
         """
-        保存计算记录
+        保存计算记录，并把当月使用次数加一
         
         参数:
             user_id: 用户ID
@@ -304,102 +836,133 @@ class Database:
             results: 计算结果
             
         返回:
-            记录ID
+            (记录ID, 保存后的当月使用次数)
         """
-        conn = self.get_connection()
-        c = conn.cursor()
+        with self.connection() as conn:
+            c = conn.cursor()
+            
+            # 保存计算记录
+            inputs_json = _json_dumps(inputs)
+            results_json = _json_dumps(results)
+            
+            if self.db_type == 'postgresql':
+                # 插入记录和更新使用统计合并成一条语句，只需一次网络往返
+                c.execute(self._sql['save_calculation'],
+                          (user_id, country, city, inputs_json, results_json, user_id))
+                record_id, new_count, year, month = c.fetchone()
+            else:
+                # 两条语句放在同一个写事务里，只提交（fsync）一次
+                c.execute('BEGIN IMMEDIATE')
+                c.execute(self._sql['insert_calculation'],
+                          (user_id, country, city, inputs_json, results_json))
+                record_id = c.lastrowid
+                
+                # 更新使用统计（年、月由数据库计算）
+                if _SQLITE_HAS_RETURNING:
+                    c.execute(self._sql['upsert_usage'] + ' RETURNING calculation_count, year, month',
+                              (user_id,))
+                else:
+                    c.execute(self._sql['upsert_usage'], (user_id,))
+                    c.execute(self._sql['get_current_usage'], (user_id,))
+                new_count, year, month = c.fetchone()
         
-        # 保存计算记录
-        inputs_json = json.dumps(inputs, ensure_ascii=False)
-        results_json = json.dumps(results, ensure_ascii=False, default=str)
+        # 提交成功后再更新缓存
+        self._cache_usage(user_id, year, month, new_count)
+        self._cache_usage(user_id, None, None, new_count)
+        return record_id, new_count
+    
+    def save_calculations_bulk(self, rows: List[Tuple[int, str, str, Dict, Dict]],
+                               count_usage: bool = False) -> int:
+        """
+        批量保存计算记录（如导入历史数据），所有记录在同一个事务中写入
         
-        if self.db_type == 'postgresql':
-            c.execute('''
-                INSERT INTO calculations (user_id, country, city, inputs, results)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
-            ''', (user_id, country, city, inputs_json, results_json))
-            record_id = c.fetchone()[0]
-        else:
-            c.execute('''
-                INSERT INTO calculations (user_id, country, city, inputs, results)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, country, city, inputs_json, results_json))
-            record_id = c.lastrowid
+        批量导入的是历史记录，默认不计入当月使用统计。
         
-        # 更新使用统计
-        now = datetime.now()
-        year = now.year
-        month = now.month
+        参数:
+            rows: (用户ID, 国家, 城市, 输入参数, 计算结果) 列表
+            count_usage: 为True时每条记录都计入对应用户的当月使用次数（同一事务中按用户合并更新）
+            
+        返回:
+            写入的记录数
+        """
+        if not rows:
+            return 0
         
-        if self.db_type == 'postgresql':
-            c.execute('''
-                INSERT INTO usage_stats (user_id, year, month, calculation_count)
-                VALUES (%s, %s, %s, 1)
-                ON CONFLICT(user_id, year, month) 
-                DO UPDATE SET calculation_count = usage_stats.calculation_count + 1
-            ''', (user_id, year, month))
-        else:
-            c.execute('''
-                INSERT INTO usage_stats (user_id, year, month, calculation_count)
-                VALUES (?, ?, ?, 1)
-                ON CONFLICT(user_id, year, month) 
-                DO UPDATE SET calculation_count = calculation_count + 1
-            ''', (user_id, year, month))
+        # 每行的JSON只序列化一次
+        params = [
+            (user_id, country, city, _json_dumps(inputs), _json_dumps(results))
+            for user_id, country, city, inputs, results in rows
+        ]
         
-        conn.commit()
-        conn.close()
-        return record_id
+        with self.connection() as conn:
+            c = conn.cursor()
+            
+            if self.db_type == 'postgresql':
+                execute_values(c, '''
+                    INSERT INTO calculations (user_id, country, city, inputs, results)
+                    VALUES %s
+                ''', params, page_size=1000)
+            else:
+                c.executemany(self._sql['insert_calculation'], params)
+            
+            if count_usage:
+                counts: Dict[int, int] = {}
+                for user_id, *_ in rows:
+                    counts[user_id] = counts.get(user_id, 0) + 1
+                c.executemany(self._sql['add_usage'], list(counts.items()))
+        
+        if count_usage:
+            # 计数已变化，清除这些用户的使用次数缓存
+            with _user_cache_lock:
+                for key in [key for key in _usage_cache
+                            if key[0] == self._cache_scope and key[1] in counts]:
+                    del _usage_cache[key]
+        return len(params)
     
-    def get_user_calculations(self, user_id: int, limit: int = 50) -> List[Dict]:
+    def get_user_calculations(self, user_id: int, limit: int = 50,
+                              stream: bool = False) -> Union[List[Dict], Iterator[Dict]]:
         """
         获取用户的计算历史
         
         参数:
             user_id: 用户ID
             limit: 返回记录数限制
+            stream: 为True时返回逐条产出记录的迭代器，便于界面边读边渲染
             
         返回:
-            计算记录列表
+            计算记录列表（stream=True时为迭代器）
+        """
+        records = self._iter_calculations(user_id, limit)
+        return records if stream else list(records)
+    
+    def _iter_calculations(self, user_id: int, limit: int) -> Iterator[Dict]:
         """
-        conn = self.get_connection()
-        c = conn.cursor()
+        逐行读取并解析计算记录，不一次性把所有行载入内存
         
-        if self.db_type == 'postgresql':
-            c.execute('''
-                SELECT * FROM calculations 
-                WHERE user_id = %s 
-                ORDER BY created_at DESC 
-                LIMIT %s
-            ''', (user_id, limit))
-        else:
-            c.execute('''
-                SELECT * FROM calculations 
-                WHERE user_id = ? 
-                ORDER BY created_at DESC 
-                LIMIT ?
-            ''', (user_id, limit))
-        
-        rows = c.fetchall()
-        conn.close()
-        
-        records = []
-        for row in rows:
+        PostgreSQL使用命名（服务端）游标，每次取回 HISTORY_ITERSIZE 行；
+        SQLite游标本身就是按需取行的。迭代结束或被关闭时归还连接。
+        """
+        with self.connection() as conn:
             if self.db_type == 'postgresql':
-                record = dict(row)
+                c = conn.cursor('calc_history')
+                c.itersize = HISTORY_ITERSIZE
             else:
-                record = dict(row)
-            # 解析JSON数据
-            record['inputs'] = json.loads(record['inputs'])
-            record['results'] = json.loads(record['results'])
-            records.append(record)
-        
-        return records
+                c = conn.cursor()
+            try:
+                c.execute(self._sql['get_user_calculations'], (user_id, limit))
+                for row in c:
+                    record = dict(row)
+                    # 解析JSON数据
+                    record['inputs'] = _json_loads(record['inputs'])
+                    record['results'] = _json_loads(record['results'])
+                    yield record
+            finally:
+                c.close()
     
     def get_monthly_usage(self, user_id: int, year: Optional[int] = None, 
                           month: Optional[int] = None) -> int:
         """
-        获取用户月度使用次数
+        获取用户月度使用次数（结果缓存 USER_CACHE_TTL 秒，保存计算时同步更新）
         
         参数:
             user_id: 用户ID
@@ -410,33 +973,56 @@ class Database:
             使用次数
         """
         if year is None or month is None:
-            now = datetime.now()
-            year = now.year
-            month = now.month
+            # 当前月由数据库计算，缓存键用 (None, None) 表示
+            year = month = None
         
-        conn = self.get_connection()
-        c = conn.cursor()
+        key = (self._cache_scope, user_id, year, month)
+        with _user_cache_lock:
+            entry = _usage_cache.get(key)
+            if entry is not None and time.monotonic() < entry[0]:
+                return entry[1]
         
-        if self.db_type == 'postgresql':
-            c.execute('''
-                SELECT calculation_count FROM usage_stats
-                WHERE user_id = %s AND year = %s AND month = %s
-            ''', (user_id, year, month))
-        else:
-            c.execute('''
-                SELECT calculation_count FROM usage_stats
-                WHERE user_id = ? AND year = ? AND month = ?
-            ''', (user_id, year, month))
+        with self.connection() as conn:
+            c = conn.cursor()
+            
+            if year is None:
+                c.execute(self._sql['get_current_usage'], (user_id,))
+            else:
+                c.execute(self._sql['get_monthly_usage'], (user_id, year, month))
+            row = c.fetchone()
+            count = row[0] if row else 0
+            self._cache_usage(user_id, year, month, count)
+            return count
+    
+    def get_user_with_usage(self, user_id: int) -> Tuple[Optional[Dict], int]:
+        """
+        同时获取用户信息和本月使用次数（都命中缓存时不查数据库，否则一次查询取回并写入两个缓存）
+        
+        参数:
+            user_id: 用户ID
+            
+        返回:
+            (用户信息字典, 本月使用次数)，用户不存在时为 (None, 0)
+        """
+        user = self._get_cached_user('id', user_id)
+        if user is not None:
+            key = (self._cache_scope, user_id, None, None)
+            with _user_cache_lock:
+                entry = _usage_cache.get(key)
+                if entry is not None and time.monotonic() < entry[0]:
+                    return user, entry[1]
         
-        row = c.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            c = conn.cursor()
+            c.execute(self._sql['get_user_with_usage'], (user_id,))
+            row = c.fetchone()
         
-        if row:
-            if self.db_type == 'postgresql':
-                return row[0] if isinstance(row, tuple) else row['calculation_count']
-            else:
-                return row['calculation_count']
-        return 0
+        if not row:
+            return None, 0
+        user = dict(row)
+        usage = user.pop('monthly_usage')
+        self._cache_usage(user_id, None, None, usage)
+        return self._cache_user(user), usage
     
     def delete_calculation(self, user_id: int, calculation_id: int) -> bool:
         """
@@ -449,22 +1035,9 @@ class Database:
         返回:
             是否成功
         """
-        conn = self.get_connection()
-        c = conn.cursor()
-        
-        if self.db_type == 'postgresql':
-            c.execute('''
-                DELETE FROM calculations 
-                WHERE id = %s AND user_id = %s
-            ''', (calculation_id, user_id))
-        else:
-            c.execute('''
-                DELETE FROM calculations 
-                WHERE id = ? AND user_id = ?
-            ''', (calculation_id, user_id))
-        
-        deleted = c.rowcount > 0
-        conn.commit()
-        conn.close()
-        return deleted
+        with self.connection() as conn:
+            c = conn.cursor()
+            
+            c.execute(self._sql['delete_calculation'], (calculation_id, user_id))
+            return c.rowcount > 0
 
@@ -4,12 +4,45 @@
 集成Stripe支付平台，处理订阅支付
 """
 
+from functools import lru_cache
+from importlib.util import find_spec
 from typing import Optional
 import streamlit as st
 from subscription import SubscriptionManager
 import os
 
 
+# 付费计划卡片的Markdown模板
+_CARD_TEMPLATE = "#### {name}\n\n{price_line}\n\n**功能包括：**\n\n{features}"
+_PRICE_TEMPLATE = "**¥{price}/{period}**"
+_DISCOUNT_PRICE_TEMPLATE = "~~¥{original_price}~~ **¥{price}/{period}** (节省{discount})"
+
+
+def _render_card(plan: dict) -> str:
+    """
+    生成单个订阅计划卡片的Markdown
+    
+    参数:
+        plan: 订阅计划字典
+        
+    返回:
+        Markdown文本
+    """
+    price_template = _DISCOUNT_PRICE_TEMPLATE if 'original_price' in plan else _PRICE_TEMPLATE
+    return _CARD_TEMPLATE.format_map({
+        'name': plan['name'],
+        'price_line': price_template.format_map(plan),
+        'features': "\n".join(f"- ✅ {feature}" for feature in plan['features'])
+    })
+
+
+@lru_cache(maxsize=1)
+def _load_stripe():
+    """首次真正发起支付请求时才导入stripe（它会连带导入requests等，开销较大）"""
+    import stripe
+    return stripe
+
+
 class PaymentManager:
     """支付管理器"""
     
@@ -19,15 +52,20 @@ class PaymentManager:
         self.stripe_public_key = os.getenv('STRIPE_PUBLIC_KEY', '')
         self.stripe_enabled = bool(self.stripe_secret_key and self.stripe_public_key)
         
-        # 如果Stripe已配置，导入stripe库
-        if self.stripe_enabled:
-            try:
-                import stripe
-                stripe.api_key = self.stripe_secret_key
-                self.stripe = stripe
-            except ImportError:
-                self.stripe_enabled = False
-                st.warning("⚠️ Stripe库未安装，请运行: pip install stripe")
+        # 如果Stripe已配置，只检查stripe库是否安装，导入推迟到首次使用
+        if self.stripe_enabled and find_spec('stripe') is None:
+            self.stripe_enabled = False
+            st.warning("⚠️ Stripe库未安装，请运行: pip install stripe")
+        
+        # 支付成功处理和测试升级共用同一个订阅管理器
+        self.subscription_manager = SubscriptionManager()
+    
+    @property
+    def stripe(self):
+        """已设置API密钥的stripe模块"""
+        stripe = _load_stripe()
+        stripe.api_key = self.stripe_secret_key
+        return stripe
     
     def create_checkout_session(self, user_id: int, plan_id: str, price: float, 
                                 currency: str = 'cny') -> Optional[str]:
@@ -115,9 +153,7 @@ class PaymentManager:
             user_id: 用户ID
             plan_id: 计划ID
         """
-        from subscription import SubscriptionManager
-        
-        subscription_manager = SubscriptionManager()
+        subscription_manager = self.subscription_manager
         
         if plan_id == 'pro_monthly':
             subscription_manager.upgrade_subscription(user_id, 'pro_monthly', 30)
@@ -131,10 +167,9 @@ class PaymentManager:
         参数:
             user_id: 用户ID
         """
-        from subscription import SubscriptionManager
-        
-        subscription_manager = SubscriptionManager()
-        plans = subscription_manager.get_subscription_plans()
+        subscription_manager = self.subscription_manager
+        plans = _get_plans()
+        plan_cards = _get_plan_cards()
         
         st.markdown("### 💳 选择订阅计划")
         
@@ -158,15 +193,7 @@ class PaymentManager:
                 col1, col2 = st.columns([3, 1])
                 
                 with col1:
-                    st.markdown(f"#### {plan['name']}")
-                    if 'original_price' in plan:
-                        st.markdown(f"~~¥{plan['original_price']}~~ **¥{plan['price']}/{plan['period']}** (节省{plan['discount']})")
-                    else:
-                        st.markdown(f"**¥{plan['price']}/{plan['period']}**")
-                    
-                    st.markdown("**功能包括：**")
-                    for feature in plan['features']:
-                        st.markdown(f"- ✅ {feature}")
+                    st.markdown(plan_cards[plan['id']])
                 
                 with col2:
                     if self.stripe_enabled:
@@ -216,3 +243,25 @@ class PaymentManager:
             - 7天内无条件退款
             - 如有问题，请联系客服
             """)
+
+
+@st.cache_resource
+def get_payment_manager() -> PaymentManager:
+    """
+    获取支付管理器（整个进程共享一个实例，Streamlit重新运行脚本时不再重复创建）
+    
+    返回:
+        PaymentManager实例
+    """
+    return PaymentManager()
+
+
+def _get_plans() -> tuple:
+    """订阅计划列表（模块级只读常量，无需再缓存或复制）"""
+    return get_payment_manager().subscription_manager.get_subscription_plans()
+
+
+@st.cache_resource
+def _get_plan_cards() -> dict:
+    """付费计划ID -> 预先生成的卡片Markdown（只生成一次，重新运行时直接查表）"""
+    return {plan['id']: _render_card(plan) for plan in _get_plans()[1:]}
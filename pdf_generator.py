@@ -7,10 +7,14 @@ PDF报告生成模块
 3. 格式清晰，便于打印和分享
 """
 
-from fpdf import FPDF
+from fpdf import FPDF, FontFace
+from fpdf.enums import XPos, YPos
 from calculator import StudyCostCalculator
 import pandas as pd
 from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from types import SimpleNamespace
 
 # 国家和城市名称翻译映射（用于PDF生成，避免中文编码问题）
 COUNTRY_TRANSLATION = {
@@ -98,23 +102,139 @@ CITY_TRANSLATION = {
     "奥斯陆": "Oslo"
 }
 
+# 月份名称翻译映射
+_MONTH_MAP = {
+    "9月": "Sep", "10月": "Oct", "11月": "Nov", "12月": "Dec",
+    "1月": "Jan", "2月": "Feb", "3月": "Mar", "4月": "Apr",
+    "5月": "May", "6月": "Jun", "7月": "Jul", "8月": "Aug"
+}
+
+# 预先绑定查表方法，生成PDF时直接调用，省去包装函数和属性查找
+_country_get = COUNTRY_TRANSLATION.get
+_city_get = CITY_TRANSLATION.get
+_month_get = _MONTH_MAP.get
+
 
 def translate_to_english(text: str, translation_map: dict) -> str:
     """将中文文本翻译为英文"""
     return translation_map.get(text, text)
 
 
+def _resolve_cols(columns) -> tuple:
+    """
+    一次遍历找出现金流表中的月份、月收入、月支出、累计余额列（列名带货币符号，按关键字匹配）
+    
+    返回:
+        (月份列, 月收入列, 月支出列, 累计余额列)
+    """
+    found = {}
+    for col in columns:
+        if "月份" in col:
+            found.setdefault('month', col)
+        elif "月收入" in col:
+            found.setdefault('income', col)
+        elif "月支出" in col:
+            found.setdefault('expense', col)
+        elif "累计余额" in col:
+            found.setdefault('balance', col)
+    return found['month'], found['income'], found['expense'], found['balance']
+
+
+# fpdf2内置字体无法显示的货币符号
+_SPECIAL_SYMBOLS = frozenset(('€', '£', '$', '¥', '₩', 'kr'))
+
+
+def _format_table_rows(df: pd.DataFrame, columns: tuple, translate_months: bool = False) -> list:
+    """
+    把现金流表格式化成字符串行（按列整体格式化，不逐行访问DataFrame）
+    
+    参数:
+        df: 现金流DataFrame
+        columns: (月份列, 月收入列, 月支出列, 累计余额列)
+        translate_months: 是否把月份翻译成英文缩写
+        
+    返回:
+        [[月份, 月收入, 月支出, 累计余额], ...]，金额保留两位小数
+    """
+    month_col, *amount_cols = columns
+    months = df[month_col].astype(str)
+    if translate_months:
+        months = months.map(_MONTH_MAP).fillna(months)
+    amounts = [df[col].map('{:.2f}'.format).tolist() for col in amount_cols]
+    return [list(row) for row in zip(months.tolist(), *amounts)]
+
+
+# 现金流表格超过这么多行时改为整张图片嵌入，不再逐行排版（如多年的现金流计划）
+TABLE_IMAGE_THRESHOLD = 30
+# 图片按块渲染，每块最多这么多行，保证一块能放进一页
+TABLE_IMAGE_ROWS_PER_BLOCK = 40
+
+
+@lru_cache(maxsize=1)
+def _lazy_figure():
+    """
+    首次需要把表格渲染成图片时才导入matplotlib
+    
+    返回:
+        matplotlib的Figure类；matplotlib未安装时返回None（调用方退回逐行排版）
+    """
+    try:
+        from matplotlib.figure import Figure
+    except ImportError:
+        return None
+    return Figure
+
+
+def _render_table_images(headers: list, rows: list, col_widths: tuple) -> list:
+    """
+    把现金流表格渲染成PNG图片（每块一张，带表头）
+    
+    直接使用Figure而不经过pyplot，不依赖全局状态，多个会话同时生成也互不影响。
+    
+    参数:
+        headers: 表头
+        rows: _format_table_rows 生成的字符串行
+        col_widths: 各列宽度（毫米）
+        
+    返回:
+        PNG字节数据列表；matplotlib未安装时返回空列表
+    """
+    Figure = _lazy_figure()
+    if Figure is None:
+        return []
+    
+    total_width = sum(col_widths)
+    rel_widths = [w / total_width for w in col_widths]
+    images = []
+    for start in range(0, len(rows), TABLE_IMAGE_ROWS_PER_BLOCK):
+        block = rows[start:start + TABLE_IMAGE_ROWS_PER_BLOCK]
+        # 与逐行排版时相同的尺寸：每行6毫米
+        fig = Figure(figsize=(total_width / 25.4, (len(block) + 1) * 6 / 25.4))
+        ax = fig.add_axes((0, 0, 1, 1))
+        ax.axis('off')
+        table = ax.table(cellText=block, colLabels=headers, colWidths=rel_widths,
+                         cellLoc='right', colLoc='center', loc='upper center', bbox=(0, 0, 1, 1))
+        table.auto_set_font_size(False)
+        table.set_fontsize(8)
+        for (row, col), cell in table.get_celld().items():
+            if row == 0:
+                cell.set_text_props(fontweight='bold')
+            elif col == 0:
+                cell.set_text_props(horizontalalignment='center')
+        
+        buffer = BytesIO()
+        fig.savefig(buffer, format='png', dpi=200)
+        images.append(buffer.getvalue())
+    return images
+
+
 def get_currency_text_for_pdf(currency_symbol: str, currency_code: str) -> str:
     """
     将货币符号转换为PDF可用的文本格式
     fpdf2不支持特殊符号如€，所以使用货币代码
     """
-    # 如果货币符号是特殊字符，使用货币代码
-    special_symbols = ['€', '£', '$', '¥', '₩', 'kr']
-    if currency_symbol in special_symbols:
-        return currency_code
-    # 如果已经是文本（如CHF, C$, A$等），直接返回
-    return currency_symbol
+    # 特殊字符改用货币代码；已经是文本（如CHF, C$, A$等）的直接返回
+    return currency_code if currency_symbol in _SPECIAL_SYMBOLS else currency_symbol
 
 
 class PDF(FPDF):
@@ -163,8 +283,8 @@ def generate_pdf_report(calculator: StudyCostCalculator,
     currency_text = get_currency_text_for_pdf(currency_symbol, currency)
     
     # 翻译国家和城市名称
-    country_en = translate_to_english(country, COUNTRY_TRANSLATION)
-    city_en = translate_to_english(calculator.city, CITY_TRANSLATION)
+    country_en = _country_get(country, country)
+    city_en = _city_get(calculator.city, calculator.city)
     
     # 设置字体
     pdf.set_font('Arial', 'B', 14)
@@ -194,8 +314,8 @@ def generate_pdf_report(calculator: StudyCostCalculator,
         f"Tuition Payment: {payment_en}"
     ]
     
-    for line in info_lines:
-        pdf.cell(0, 8, line, 0, 1)
+    # 所有行一次写入，每行高8，写完回到左边距下一行
+    pdf.multi_cell(0, 8, "\n".join(info_lines), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
     
     pdf.ln(5)
     
@@ -214,17 +334,11 @@ def generate_pdf_report(calculator: StudyCostCalculator,
         f"Minimum Balance: {summary['min_balance']:.2f} {currency_text}"
     ]
     
-    for line in summary_lines:
-        pdf.cell(0, 8, line, 0, 1)
+    pdf.multi_cell(0, 8, "\n".join(summary_lines), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
     
     if summary['critical_months']:
         # 翻译月份名称
-        month_map = {
-            "9月": "Sep", "10月": "Oct", "11月": "Nov", "12月": "Dec",
-            "1月": "Jan", "2月": "Feb", "3月": "Mar", "4月": "Apr",
-            "5月": "May", "6月": "Jun", "7月": "Jul", "8月": "Aug"
-        }
-        critical_months_en = [month_map.get(m, m) for m in summary['critical_months']]
+        critical_months_en = [_month_get(m, m) for m in summary['critical_months']]
         pdf.cell(0, 8, f"Critical Months: {', '.join(critical_months_en)}", 0, 1)
         pdf.cell(0, 8, f"Need Support: {summary['need_support']:.2f} {currency_text}", 0, 1)
     
@@ -235,133 +349,68 @@ def generate_pdf_report(calculator: StudyCostCalculator,
     pdf.cell(0, 10, '3. 12-Month Cash Flow Details', 0, 1)
     pdf.ln(2)
     
-    # 表格标题
-    pdf.set_font('Arial', 'B', 9)
-    col_widths = [30, 40, 40, 50]
+    col_widths = (30, 40, 40, 50)
     headers = ['Month', f'Income ({currency_text})', f'Expense ({currency_text})', f'Balance ({currency_text})']
     
-    for i, header in enumerate(headers):
-        pdf.cell(col_widths[i], 8, header, 1, 0, 'C')
-    pdf.ln()
+    # 获取列名（动态）
+    month_col, income_col, expense_col, balance_col = _resolve_cols(df.columns)
     
-    # 月份名称映射
-    month_map = {
-        "9月": "Sep", "10月": "Oct", "11月": "Nov", "12月": "Dec",
-        "1月": "Jan", "2月": "Feb", "3月": "Mar", "4月": "Apr",
-        "5月": "May", "6月": "Jun", "7月": "Jul", "8月": "Aug"
-    }
+    # 表格数据：整列一次性格式化成字符串，不再逐行访问DataFrame
+    rows = _format_table_rows(df, (month_col, income_col, expense_col, balance_col), translate_months=True)
     
-    # 获取列名（动态）
-    month_col = [col for col in df.columns if "月份" in col][0]
-    income_col = [col for col in df.columns if "月收入" in col][0]
-    expense_col = [col for col in df.columns if "月支出" in col][0]
-    balance_col = [col for col in df.columns if "累计余额" in col][0]
-    
-    # 表格数据
-    pdf.set_font('Arial', '', 8)
-    for _, row in df.iterrows():
-        month_name = str(row[month_col])
-        month_en = month_map.get(month_name, month_name)
-        pdf.cell(col_widths[0], 6, month_en, 1, 0, 'C')
-        pdf.cell(col_widths[1], 6, f"{row[income_col]:.2f}", 1, 0, 'R')
-        pdf.cell(col_widths[2], 6, f"{row[expense_col]:.2f}", 1, 0, 'R')
-        pdf.cell(col_widths[3], 6, f"{row[balance_col]:.2f}", 1, 0, 'R')
-        pdf.ln()
-    
-    # 返回PDF字节数据
-    pdf_output = pdf.output(dest='S')
-    # pdf.output(dest='S') 返回的是 bytes 或 bytearray，直接返回
-    if isinstance(pdf_output, bytearray):
-        return bytes(pdf_output)
-    return pdf_output
+    # 行数很多时整块渲染成图片嵌入，fpdf2不必逐行排版；放不下当前页时 image() 会自动换页
+    images = _render_table_images(headers, rows, col_widths) if len(rows) > TABLE_IMAGE_THRESHOLD else []
+    if images:
+        for image in images:
+            pdf.image(BytesIO(image), w=sum(col_widths))
+    else:
+        # 用fpdf2的表格统一排版，表头加粗居中，数据列与原先一致（月份居中，金额右对齐）
+        pdf.set_font('Arial', '', 8)
+        with pdf.table(col_widths=col_widths, width=sum(col_widths), align='LEFT',
+                       text_align=('CENTER', 'RIGHT', 'RIGHT', 'RIGHT'), line_height=6,
+                       headings_style=FontFace(emphasis='BOLD', size_pt=9)) as table:
+            heading = table.row()
+            for header in headers:
+                heading.cell(header, align='CENTER')
+            for values in rows:
+                table.row(values)
+    
+    # 返回PDF字节数据：fpdf2 的 output() 返回 bytearray，而 st.download_button 只接受 bytes，
+    # 所以这里仍需转换一次（dest 参数在 fpdf2 中已弃用，不再传入）
+    return bytes(pdf.output())
 
 
 # 注意：由于fpdf2对中文支持有限，如果需要更好的中文支持，可以使用reportlab
 # 这里提供一个使用reportlab的替代方案（可选）
 
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib import colors
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    from io import BytesIO
+@lru_cache(maxsize=1)
+def _lazy_reportlab() -> SimpleNamespace:
+    """
+    首次生成reportlab版PDF时才导入reportlab（只用fpdf2的用户不必承担其导入开销）
+    
+    样式表和现金流表格样式也在这里创建一次，各次生成PDF共用（只读，不会被修改）。
+    
+    异常:
+        ImportError: reportlab未安装
+    """
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib import colors
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet
+    except ImportError:
+        raise ImportError("生成中文版PDF需要安装reportlab库。请运行: pip install reportlab") from None
     
     # 如果需要使用reportlab，可以注册中文字体
+    # from reportlab.pdfbase import pdfmetrics
+    # from reportlab.pdfbase.ttfonts import TTFont
     # pdfmetrics.registerFont(TTFont('SimHei', 'SimHei.ttf'))
     
-    def generate_pdf_report_reportlab(calculator: StudyCostCalculator,
-                                     summary: dict,
-                                     df: pd.DataFrame) -> bytes:
-        """使用reportlab生成PDF（更好的中文支持）"""
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        story = []
-        styles = getSampleStyleSheet()
-        
-        # 获取货币信息
-        currency_symbol = summary.get('currency_symbol', 'EUR')
-        country = summary.get('country', '')
-        country_en = translate_to_english(country, COUNTRY_TRANSLATION)
-        city_en = translate_to_english(calculator.city, CITY_TRANSLATION)
-        
-        # 翻译
-        rent_type_map = {"单间": "Single Room", "合租": "Shared Room", "宿舍": "Dormitory"}
-        rent_type_en = rent_type_map.get(calculator.rent_type, calculator.rent_type)
-        payment_map = {"一次性": "One-time", "分期": "Installment"}
-        payment_en = payment_map.get(calculator.tuition_payment, calculator.tuition_payment)
-        
-        # 标题
-        title = Paragraph("International Student Cost Calculator Report", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
-        
-        # 用户输入信息
-        story.append(Paragraph("1. User Input Information", styles['Heading2']))
-        info_text = f"""
-        Country: {country_en}<br/>
-        City: {city_en}<br/>
-        Rent Type: {rent_type_en}<br/>
-        Has Job: {'Yes' if calculator.has_job else 'No'}<br/>
-        Weekly Hours: {calculator.weekly_hours}<br/>
-        Hourly Wage: {calculator.hourly_wage:.2f} {currency_symbol}<br/>
-        Initial Deposit: {calculator.initial_deposit:.2f} {currency_symbol}<br/>
-        Tuition Total: {calculator.tuition_total:.2f} {currency_symbol}<br/>
-        Tuition Payment: {payment_en}
-        """
-        story.append(Paragraph(info_text, styles['Normal']))
-        story.append(Spacer(1, 12))
-        
-        # 计算结果
-        story.append(Paragraph("2. Calculation Summary", styles['Heading2']))
-        summary_text = f"""
-        Monthly Income: {summary['monthly_income']:.2f} EUR<br/>
-        Monthly Base Expense: {summary['monthly_expense_base']:.2f} EUR<br/>
-        Final Balance: {summary['final_balance']:.2f} EUR<br/>
-        Minimum Balance: {summary['min_balance']:.2f} EUR<br/>
-        """
-        if summary['critical_months']:
-            summary_text += f"Critical Months: {', '.join(summary['critical_months'])}<br/>"
-            summary_text += f"Need Support: {summary['need_support']:.2f} EUR<br/>"
-        story.append(Paragraph(summary_text, styles['Normal']))
-        story.append(Spacer(1, 12))
-        
-        # 现金流表格
-        story.append(Paragraph("3. 12个月现金流明细", styles['Heading2']))
-        
-        # 准备表格数据
-        table_data = [['Month', 'Income (EUR)', 'Expense (EUR)', 'Balance (EUR)']]
-        for _, row in df.iterrows():
-            table_data.append([
-                str(row['月份']),
-                f"{row['月收入（€）']:.2f}",
-                f"{row['月支出（€）']:.2f}",
-                f"{row['累计余额（€）']:.2f}"
-            ])
-        
-        table = Table(table_data)
-        table.setStyle(TableStyle([
+    return SimpleNamespace(
+        A4=A4, SimpleDocTemplate=SimpleDocTemplate, Table=Table,
+        Paragraph=Paragraph, Spacer=Spacer,
+        styles=getSampleStyleSheet(),
+        table_style=TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
@@ -370,118 +419,179 @@ try:
             ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
             ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
             ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-        
-        # 生成PDF
-        doc.build(story)
-        buffer.seek(0)
-        return buffer.getvalue()
-    
-    # 定义中文版PDF生成函数（在try块内，使用reportlab）
-    def generate_pdf_report_chinese(calculator: StudyCostCalculator,
-                                    summary: dict,
-                                    df: pd.DataFrame) -> bytes:
-        """使用reportlab生成中文版PDF"""
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        story = []
-        styles = getSampleStyleSheet()
-        
-        # 获取货币信息
-        currency_symbol = summary.get('currency_symbol', 'EUR')
-        currency = summary.get('currency', 'EUR')
-        country = summary.get('country', '')
-        city = calculator.city
-        
-        # 翻译房租类型和支付方式（保持中文）
-        rent_type_map = {"单间": "单间", "合租": "合租", "宿舍": "宿舍"}
-        rent_type_cn = rent_type_map.get(calculator.rent_type, calculator.rent_type)
-        payment_map = {"一次性": "一次性", "分期": "分期"}
-        payment_cn = payment_map.get(calculator.tuition_payment, calculator.tuition_payment)
-        
-        # 标题
-        title = Paragraph("留学生成本计算报告", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
-        
-        # 用户输入信息
-        story.append(Paragraph("1. 用户输入信息", styles['Heading2']))
-        info_text = f"""
-        国家: {country}<br/>
-        城市: {city}<br/>
-        房租类型: {rent_type_cn}<br/>
-        是否打工: {'是' if calculator.has_job else '否'}<br/>
-        每周工作小时数: {calculator.weekly_hours}<br/>
-        小时工资: {calculator.hourly_wage:.2f} {currency_symbol}<br/>
-        初始存款: {calculator.initial_deposit:.2f} {currency_symbol}<br/>
-        学费总额: {calculator.tuition_total:.2f} {currency_symbol}<br/>
-        学费支付方式: {payment_cn}
-        """
-        story.append(Paragraph(info_text, styles['Normal']))
-        story.append(Spacer(1, 12))
-        
-        # 计算结果
-        story.append(Paragraph("2. 计算结果摘要", styles['Heading2']))
-        summary_text = f"""
-        月收入: {summary['monthly_income']:.2f} {currency_symbol}<br/>
-        月基础支出: {summary['monthly_expense_base']:.2f} {currency_symbol}<br/>
-        月房租: {summary.get('monthly_rent', 0):.2f} {currency_symbol}<br/>
-        月生活费: {summary.get('monthly_living_cost', 0):.2f} {currency_symbol}<br/>
-        最终余额: {summary['final_balance']:.2f} {currency_symbol}<br/>
-        最低余额: {summary['min_balance']:.2f} {currency_symbol}<br/>
-        """
-        if summary['critical_months']:
-            summary_text += f"危险月份: {', '.join(summary['critical_months'])}<br/>"
-            summary_text += f"需要补钱: {summary['need_support']:.2f} {currency_symbol}<br/>"
-        story.append(Paragraph(summary_text, styles['Normal']))
-        story.append(Spacer(1, 12))
-        
-        # 现金流表格
-        story.append(Paragraph("3. 12个月现金流明细", styles['Heading2']))
-        
-        # 获取列名
-        month_col = [col for col in df.columns if "月份" in col][0]
-        income_col = [col for col in df.columns if "月收入" in col][0]
-        expense_col = [col for col in df.columns if "月支出" in col][0]
-        balance_col = [col for col in df.columns if "累计余额" in col][0]
-        
-        # 准备表格数据
-        table_data = [['月份', f'月收入（{currency_symbol}）', f'月支出（{currency_symbol}）', f'累计余额（{currency_symbol}）']]
-        for _, row in df.iterrows():
-            table_data.append([
-                str(row[month_col]),
-                f"{row[income_col]:.2f}",
-                f"{row[expense_col]:.2f}",
-                f"{row[balance_col]:.2f}"
-            ])
-        
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
+        ])
+    )
+
+
+@lru_cache(maxsize=32)
+def _parse_para(text: str, style_name: str) -> tuple:
+    """
+    标题等固定文字的标记只解析一次（解析是创建Paragraph的主要开销）
+    
+    参数:
+        text: 文字
+        style_name: 样式表中的样式名
         
-        # 生成PDF
-        doc.build(story)
-        buffer.seek(0)
-        return buffer.getvalue()
+    返回:
+        (解析后的样式, 文字片段元组)，只读，不要修改
+    """
+    rl = _lazy_reportlab()
+    paragraph = rl.Paragraph(text, rl.styles[style_name])
+    return paragraph.style, tuple(paragraph.frags)
+
+
+def _para(text: str, style_name: str):
+    """
+    用缓存的解析结果创建Paragraph
+    
+    Paragraph排版时会把换行结果保存在自身上，所以每个文档都新建一个，
+    文字片段也复制一份，不在多个文档或线程之间共用。
+    
+    参数:
+        text: 文字
+        style_name: 样式表中的样式名
+    """
+    style, frags = _parse_para(text, style_name)
+    return _lazy_reportlab().Paragraph(text, style, frags=[frag.clone() for frag in frags])
+
+# reportlab版报告的文字：英文版和中文版共用同一个生成函数，只是文字不同
+# summary_items 为 (标签, summary中的键)；unit_code 为True时摘要和表格中的金额单位使用货币代码
+_REPORTLAB_LABELS = {
+    'en': {
+        'title': "International Student Cost Calculator Report",
+        'section_user': "1. User Input Information",
+        'section_summary': "2. Calculation Summary",
+        'section_table': "3. 12个月现金流明细",
+        'translate_place': True,
+        'unit_code': True,
+        'info': ('Country', 'City', 'Rent Type', 'Has Job', 'Weekly Hours', 'Hourly Wage',
+                 'Initial Deposit', 'Tuition Total', 'Tuition Payment'),
+        'yes_no': ('Yes', 'No'),
+        'rent_types': {"单间": "Single Room", "合租": "Shared Room", "宿舍": "Dormitory"},
+        'payments': {"一次性": "One-time", "分期": "Installment"},
+        'summary_items': (('Monthly Income', 'monthly_income'),
+                          ('Monthly Base Expense', 'monthly_expense_base'),
+                          ('Final Balance', 'final_balance'),
+                          ('Minimum Balance', 'min_balance')),
+        'critical_months': 'Critical Months',
+        'need_support': 'Need Support',
+        'table_headers': ('Month', 'Income ({unit})', 'Expense ({unit})', 'Balance ({unit})')
+    },
+    'zh': {
+        'title': "留学生成本计算报告",
+        'section_user': "1. 用户输入信息",
+        'section_summary': "2. 计算结果摘要",
+        'section_table': "3. 12个月现金流明细",
+        'translate_place': False,
+        'unit_code': False,
+        'info': ('国家', '城市', '房租类型', '是否打工', '每周工作小时数', '小时工资',
+                 '初始存款', '学费总额', '学费支付方式'),
+        'yes_no': ('是', '否'),
+        'rent_types': {},
+        'payments': {},
+        'summary_items': (('月收入', 'monthly_income'),
+                          ('月基础支出', 'monthly_expense_base'),
+                          ('月房租', 'monthly_rent'),
+                          ('月生活费', 'monthly_living_cost'),
+                          ('最终余额', 'final_balance'),
+                          ('最低余额', 'min_balance')),
+        'critical_months': '危险月份',
+        'need_support': '需要补钱',
+        'table_headers': ('月份', '月收入（{unit}）', '月支出（{unit}）', '累计余额（{unit}）')
+    }
+}
+
+
+def _build_reportlab(calculator: StudyCostCalculator,
+                     summary: dict,
+                     df: pd.DataFrame,
+                     labels: dict) -> bytes:
+    """
+    用reportlab生成PDF报告（英文版、中文版共用）
+    
+    参数:
+        calculator: 计算器实例
+        summary: 计算结果摘要
+        df: 现金流DataFrame
+        labels: 报告文字，见 _REPORTLAB_LABELS
         
-except ImportError:
-    # 如果reportlab未安装，创建一个占位函数
-    def generate_pdf_report_chinese(calculator: StudyCostCalculator,
-                                    summary: dict,
-                                    df: pd.DataFrame) -> bytes:
-        """中文版PDF生成（需要reportlab库）"""
-        raise ImportError("生成中文版PDF需要安装reportlab库。请运行: pip install reportlab")
+    返回:
+        PDF文件的字节数据
+    """
+    rl = _lazy_reportlab()
+    buffer = BytesIO()
+    doc = rl.SimpleDocTemplate(buffer, pagesize=rl.A4)
+    story = []
+    styles = rl.styles
+    
+    # 获取货币信息
+    currency_symbol = summary.get('currency_symbol', 'EUR')
+    currency = summary.get('currency', 'EUR')
+    unit = get_currency_text_for_pdf(currency_symbol, currency) if labels['unit_code'] else currency_symbol
+    country = summary.get('country', '')
+    city = calculator.city
+    if labels['translate_place']:
+        country = _country_get(country, country)
+        city = _city_get(city, city)
+    
+    # 翻译房租类型和支付方式
+    rent_type = labels['rent_types'].get(calculator.rent_type, calculator.rent_type)
+    payment = labels['payments'].get(calculator.tuition_payment, calculator.tuition_payment)
+    yes, no = labels['yes_no']
+    
+    # 标题
+    story.append(_para(labels['title'], 'Title'))
+    story.append(rl.Spacer(1, 12))
+    
+    # 用户输入信息
+    story.append(_para(labels['section_user'], 'Heading2'))
+    info_values = (
+        country,
+        city,
+        rent_type,
+        yes if calculator.has_job else no,
+        calculator.weekly_hours,
+        f"{calculator.hourly_wage:.2f} {currency_symbol}",
+        f"{calculator.initial_deposit:.2f} {currency_symbol}",
+        f"{calculator.tuition_total:.2f} {currency_symbol}",
+        payment
+    )
+    info_text = "<br/>".join(f"{label}: {value}" for label, value in zip(labels['info'], info_values))
+    story.append(rl.Paragraph(info_text, styles['Normal']))
+    story.append(rl.Spacer(1, 12))
+    
+    # 计算结果
+    story.append(_para(labels['section_summary'], 'Heading2'))
+    summary_lines = [f"{label}: {summary.get(key, 0):.2f} {unit}" for label, key in labels['summary_items']]
+    if summary['critical_months']:
+        summary_lines.append(f"{labels['critical_months']}: {', '.join(summary['critical_months'])}")
+        summary_lines.append(f"{labels['need_support']}: {summary['need_support']:.2f} {unit}")
+    story.append(rl.Paragraph("<br/>".join(summary_lines), styles['Normal']))
+    story.append(rl.Spacer(1, 12))
+    
+    # 现金流表格
+    story.append(_para(labels['section_table'], 'Heading2'))
+    table_data = [[header.format(unit=unit) for header in labels['table_headers']]]
+    table_data += _format_table_rows(df, _resolve_cols(df.columns))
+    
+    table = rl.Table(table_data)
+    table.setStyle(rl.table_style)
+    story.append(table)
+    
+    # 生成PDF
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def generate_pdf_report_reportlab(calculator: StudyCostCalculator,
+                                  summary: dict,
+                                  df: pd.DataFrame) -> bytes:
+    """使用reportlab生成英文版PDF（需要reportlab库）"""
+    return _build_reportlab(calculator, summary, df, _REPORTLAB_LABELS['en'])
 
 
+def generate_pdf_report_chinese(calculator: StudyCostCalculator,
+                                summary: dict,
+                                df: pd.DataFrame) -> bytes:
+    """使用reportlab生成中文版PDF（需要reportlab库）"""
+    return _build_reportlab(calculator, summary, df, _REPORTLAB_LABELS['zh'])
@@ -6,18 +6,62 @@
 
 from database import Database
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
+
+
+# 用户统计一次查询取回：第一行 (kind=0) 是总次数和最近次数，其后 (kind=1) 是最常使用的城市
+_USER_STATS_SQL = '''
+    WITH t AS (
+        SELECT city, created_at FROM calculations WHERE user_id = ?
+    ),
+    top AS (
+        SELECT city, COUNT(*) AS count FROM t
+        GROUP BY city
+        ORDER BY count DESC
+        LIMIT 5
+    )
+    SELECT 0 AS kind, NULL AS city,
+           (SELECT COUNT(*) FROM t) AS count,
+           (SELECT COUNT(*) FROM t WHERE created_at >= ?) AS recent
+    UNION ALL
+    SELECT 1, city, count, NULL FROM top
+    ORDER BY kind, count DESC
+'''
+
+# 仪表板统计结果缓存时间（秒），Streamlit重新运行脚本时直接复用，不再重复查询数据库
+USER_STATS_TTL = 60
+GLOBAL_STATS_TTL = 300
+
+
+@st.cache_data(ttl=USER_STATS_TTL)
+def _cached_user_stats(_manager: "StatsManager", db_scope: str, user_id: int) -> Dict:
+    """缓存的用户统计（db_scope 区分不同数据库，_manager 不参与缓存键）"""
+    return _manager.get_user_stats(user_id)
+
+
+@st.cache_data(ttl=USER_STATS_TTL)
+def _cached_usage_trend(_manager: "StatsManager", db_scope: str, user_id: int, days: int) -> pd.DataFrame:
+    """缓存的使用趋势"""
+    return _manager.get_usage_trend(user_id, days)
+
+
+@st.cache_data(ttl=GLOBAL_STATS_TTL)
+def _cached_global_stats(_manager: "StatsManager", db_scope: str) -> Dict:
+    """缓存的全局统计"""
+    return _manager.get_global_stats()
 
 
 class StatsManager:
     """统计管理器"""
     
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db: Optional[Database] = None):
+        """
+        参数:
+            db: 使用的数据库（默认新建，测试时可传入 Database.for_tests()）
+        """
+        self.db = db or Database()
     
     def get_user_stats(self, user_id: int) -> Dict:
         """
@@ -29,60 +73,22 @@ class StatsManager:
         返回:
             统计信息字典
         """
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        
-        # 总计算次数
-        if self.db.db_type == 'postgresql':
-            c.execute('SELECT COUNT(*) FROM calculations WHERE user_id = %s', (user_id,))
-        else:
-            c.execute('SELECT COUNT(*) FROM calculations WHERE user_id = ?', (user_id,))
-        total_calculations = c.fetchone()[0] or 0
-        
-        # 本月计算次数
-        now = datetime.now()
-        year = now.year
-        month = now.month
-        monthly_usage = self.db.get_monthly_usage(user_id, year, month)
-        
-        # 最常使用的城市
-        if self.db.db_type == 'postgresql':
-            c.execute('''
-                SELECT city, COUNT(*) as count 
-                FROM calculations 
-                WHERE user_id = %s 
-                GROUP BY city 
-                ORDER BY count DESC 
-                LIMIT 5
-            ''', (user_id,))
-        else:
-            c.execute('''
-                SELECT city, COUNT(*) as count 
-                FROM calculations 
-                WHERE user_id = ? 
-                GROUP BY city 
-                ORDER BY count DESC 
-                LIMIT 5
-            ''', (user_id,))
-        top_cities = [dict(row) for row in c.fetchall()] if self.db.db_type == 'postgresql' else [dict(row) for row in c.fetchall()]
-        
-        # 最近7天的计算次数
-        seven_days_ago = now - timedelta(days=7)
-        if self.db.db_type == 'postgresql':
-            c.execute('''
-                SELECT COUNT(*) 
-                FROM calculations 
-                WHERE user_id = %s AND created_at >= %s
-            ''', (user_id, seven_days_ago))
-        else:
-            c.execute('''
-                SELECT COUNT(*) 
-                FROM calculations 
-                WHERE user_id = ? AND created_at >= ?
-            ''', (user_id, seven_days_ago))
-        recent_count = c.fetchone()[0] or 0
-        
-        conn.close()
+        with self.db.connection() as conn:
+            c = conn.cursor()
+        
+            # 总计算次数、最近7天的计算次数和最常使用的城市，一次查询取回
+            now = datetime.now()
+            seven_days_ago = now - timedelta(days=7)
+            c.execute(self.db.adapt(_USER_STATS_SQL), (user_id, seven_days_ago))
+            rows = c.fetchall()
+
+            _, _, total_calculations, recent_count = rows[0]
+            total_calculations = total_calculations or 0
+            recent_count = recent_count or 0
+            top_cities = [{'city': city, 'count': count} for _, city, count, _ in rows[1:]]
+
+        # 本月计算次数（连接归还之后再查询，不同时占用两个连接）
+        monthly_usage = self.db.get_monthly_usage(user_id, now.year, now.month)
         
         return {
             'total_calculations': total_calculations,
@@ -98,35 +104,28 @@ class StatsManager:
         返回:
             全局统计信息
         """
-        conn = self.db.get_connection()
-        c = conn.cursor()
+        with self.db.connection() as conn:
+            c = conn.cursor()
         
-        # 总用户数
-        c.execute('SELECT COUNT(*) FROM users')
-        total_users = c.fetchone()[0] or 0
+            # 总用户数
+            c.execute('SELECT COUNT(*) FROM users')
+            total_users = c.fetchone()[0] or 0
         
-        # 总计算次数
-        c.execute('SELECT COUNT(*) FROM calculations')
-        total_calculations = c.fetchone()[0] or 0
+            # 总计算次数
+            c.execute('SELECT COUNT(*) FROM calculations')
+            total_calculations = c.fetchone()[0] or 0
         
-        # 付费用户数
-        if self.db.db_type == 'postgresql':
-            c.execute("SELECT COUNT(*) FROM users WHERE subscription_type != 'free'")
-        else:
+            # 付费用户数
             c.execute("SELECT COUNT(*) FROM users WHERE subscription_type != 'free'")
-        paid_users = c.fetchone()[0] or 0
+            paid_users = c.fetchone()[0] or 0
         
-        # 本月新增用户
-        now = datetime.now()
-        first_day = datetime(now.year, now.month, 1)
-        if self.db.db_type == 'postgresql':
-            c.execute('SELECT COUNT(*) FROM users WHERE created_at >= %s', (first_day,))
-        else:
-            c.execute('SELECT COUNT(*) FROM users WHERE created_at >= ?', (first_day,))
-        new_users_this_month = c.fetchone()[0] or 0
+            # 本月新增用户
+            now = datetime.now()
+            first_day = datetime(now.year, now.month, 1)
+            c.execute(self.db.adapt('SELECT COUNT(*) FROM users WHERE created_at >= ?'), (first_day,))
+            new_users_this_month = c.fetchone()[0] or 0
         
-        # 热门城市
-        if self.db.db_type == 'postgresql':
+            # 热门城市
             c.execute('''
                 SELECT city, COUNT(*) as count 
                 FROM calculations 
@@ -134,17 +133,7 @@ class StatsManager:
                 ORDER BY count DESC 
                 LIMIT 10
             ''')
-        else:
-            c.execute('''
-                SELECT city, COUNT(*) as count 
-                FROM calculations 
-                GROUP BY city 
-                ORDER BY count DESC 
-                LIMIT 10
-            ''')
-        top_cities = [dict(row) for row in c.fetchall()]
-        
-        conn.close()
+            top_cities = list(map(dict, c.fetchall()))
         
         return {
             'total_users': total_users,
@@ -167,41 +156,24 @@ class StatsManager:
         返回:
             趋势数据DataFrame
         """
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        
         start_date = datetime.now() - timedelta(days=days)
-        
-        if self.db.db_type == 'postgresql':
-            c.execute('''
-                SELECT DATE(created_at) as date, COUNT(*) as count
-                FROM calculations
-                WHERE user_id = %s AND created_at >= %s
-                GROUP BY DATE(created_at)
-                ORDER BY date
-            ''', (user_id, start_date))
-        else:
-            c.execute('''
-                SELECT DATE(created_at) as date, COUNT(*) as count
-                FROM calculations
-                WHERE user_id = ? AND created_at >= ?
-                GROUP BY DATE(created_at)
-                ORDER BY date
-            ''', (user_id, start_date))
-        
-        rows = c.fetchall()
-        conn.close()
-        
-        if rows:
-            df = pd.DataFrame(rows, columns=['date', 'count'])
-            df['date'] = pd.to_datetime(df['date'])
-            return df
-        else:
-            return pd.DataFrame(columns=['date', 'count'])
+        sql = '''
+            SELECT DATE(created_at) as date, COUNT(*) as count
+            FROM calculations
+            WHERE user_id = ? AND created_at >= ?
+            GROUP BY DATE(created_at)
+            ORDER BY date
+        '''
+        # 由pandas直接按列构建DataFrame并解析日期，无需逐行转换
+        with self.db.connection() as conn:
+            return pd.read_sql_query(self.db.adapt(sql), conn, params=(user_id, start_date), parse_dates=['date'])
     
     def show_user_stats_dashboard(self, user_id: int):
         """显示用户统计仪表板"""
-        stats = self.get_user_stats(user_id)
+        # plotly.express 导入较慢，只在显示仪表板时导入
+        import plotly.express as px
+        
+        stats = _cached_user_stats(self, self.db.cache_scope, user_id)
         
         st.markdown("### 📊 我的使用统计")
         
@@ -218,7 +190,7 @@ class StatsManager:
         
         # 使用趋势图
         st.markdown("#### 📈 使用趋势（最近30天）")
-        trend_df = self.get_usage_trend(user_id, 30)
+        trend_df = _cached_usage_trend(self, self.db.cache_scope, user_id, 30)
         
         if not trend_df.empty:
             fig = px.line(trend_df, x='date', y='count', 
@@ -240,7 +212,9 @@ class StatsManager:
     
     def show_admin_dashboard(self):
         """显示管理员统计仪表板"""
-        stats = self.get_global_stats()
+        import plotly.express as px
+        
+        stats = _cached_global_stats(self, self.db.cache_scope)
         
         st.markdown("### 📊 全局统计")
         
@@ -4,9 +4,73 @@
 管理用户订阅状态、检查订阅权限等
 """
 
+from contextvars import ContextVar
 from database import Database
 from datetime import datetime, timedelta
-from typing import Optional
+import logging
+import time
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# 请求级缓存：一次请求（Streamlit每次运行脚本）内 get_usage_info 的结果只计算一次
+# 未调用 begin_request 时为None，不缓存
+_request_cache: ContextVar[Optional[dict]] = ContextVar('subscription_request_cache', default=None)
+
+
+def begin_request():
+    """开始一次新的请求，丢弃上一次请求缓存的使用信息（在每次运行脚本开始时调用）"""
+    _request_cache.set({})
+
+# 订阅计划（内容固定，导入时创建一次；MappingProxyType 和元组保证调用方不能修改共享的数据）
+_SUBSCRIPTION_PLANS = (
+    MappingProxyType({
+        'id': 'free',
+        'name': '免费版',
+        'price': 0,
+        'features': (
+            '每月3次计算',
+            '基础图表',
+            'Excel导出',
+            '基础PDF报告'
+        )
+    }),
+    MappingProxyType({
+        'id': 'pro_monthly',
+        'name': '专业版（月付）',
+        'price': 29,
+        'period': '月',
+        'features': (
+            '无限次计算',
+            '多场景对比（最多5个）',
+            '高级分析报告',
+            '历史记录保存（无限）',
+            '高级PDF报告',
+            '预算优化建议',
+            '无广告'
+        )
+    }),
+    MappingProxyType({
+        'id': 'pro_yearly',
+        'name': '专业版（年付）',
+        'price': 299,
+        'period': '年',
+        'original_price': 348,  # 29 * 12
+        'discount': '14%',
+        'features': (
+            '无限次计算',
+            '多场景对比（最多5个）',
+            '高级分析报告',
+            '历史记录保存（无限）',
+            '高级PDF报告',
+            '预算优化建议',
+            '无广告',
+            '优先支持'
+        )
+    })
+)
 
 
 class SubscriptionManager:
@@ -16,12 +80,18 @@ class SubscriptionManager:
     FREE = "free"
     PRO_MONTHLY = "pro_monthly"
     PRO_YEARLY = "pro_yearly"
+    # 付费订阅类型（判断是否为付费用户时使用）
+    PRO_TYPES = frozenset({PRO_MONTHLY, PRO_YEARLY})
     
     # 免费用户限制
     FREE_MONTHLY_LIMIT = 3
     
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db: Optional[Database] = None):
+        """
+        参数:
+            db: 使用的数据库（默认新建，测试时可传入 Database.for_tests()）
+        """
+        self.db = db or Database()
     
     def get_subscription_type(self, user_id: int) -> str:
         """
@@ -33,38 +103,64 @@ class SubscriptionManager:
         返回:
             订阅类型
         """
-        user = self.db.get_user_by_id(user_id)
+        return self._resolve(user_id)[0]
+    
+    def _resolve(self, user_id: int, user: Optional[Dict] = None) -> Tuple[str, Optional[Dict]]:
+        """
+        根据用户信息得出订阅类型（含过期检查），调用方已取到用户信息时直接传入，不再查询
+        
+        参数:
+            user_id: 用户ID
+            user: 已取到的用户信息（默认按ID查询）
+            
+        返回:
+            (订阅类型, 用户信息)
+        """
+        if user is None:
+            user = self.db.get_user_by_id(user_id)
         if not user:
-            return self.FREE
+            return self.FREE, user
         
         subscription_type = user.get('subscription_type', self.FREE)
-        expires_at = user.get('subscription_expires_at')
+        # 过期时间的时间戳在用户写入缓存时已算好，这里只比较数字
+        expires_ts = user.get('subscription_expires_ts')
         
-        # 检查是否过期
-        if expires_at and subscription_type != self.FREE:
-            try:
-                expires = datetime.fromisoformat(expires_at)
-                if datetime.now() > expires:
-                    # 订阅已过期，降级为免费用户
-                    self.db.update_subscription(user_id, self.FREE)
-                    return self.FREE
-            except:
-                pass
-        
-        return subscription_type
+        # 检查是否过期：过期的订阅按免费用户处理，数据库中的降级由 sweep_expired 定时批量完成，读取时不写库
+        if expires_ts and subscription_type != self.FREE and time.time() > expires_ts:
+            return self.FREE, user
+        
+        return subscription_type, user
     
-    def is_pro_user(self, user_id: int) -> bool:
+    def get_subscription_types(self, user_ids: List[int]) -> Dict[int, str]:
+        """
+        批量获取多个用户的订阅类型（一次查询，用于管理员用户列表等）
+        
+        参数:
+            user_ids: 用户ID列表
+            
+        返回:
+            用户ID -> 订阅类型（不存在的用户为免费版）
+        """
+        users = self.db.get_users_by_ids(user_ids)
+        return {
+            user_id: self._resolve(user_id, users[user_id])[0] if user_id in users else self.FREE
+            for user_id in user_ids
+        }
+    
+    def is_pro_user(self, user_id: int, subscription: Optional[str] = None) -> bool:
         """
         检查用户是否为付费用户
         
         参数:
             user_id: 用户ID
+            subscription: 已取到的订阅类型（默认重新查询）
             
         返回:
             是否为付费用户
         """
-        subscription = self.get_subscription_type(user_id)
-        return subscription in [self.PRO_MONTHLY, self.PRO_YEARLY]
+        if subscription is None:
+            subscription = self.get_subscription_type(user_id)
+        return subscription in self.PRO_TYPES
     
     def can_calculate(self, user_id: int) -> tuple[bool, str]:
         """
@@ -76,10 +172,9 @@ class SubscriptionManager:
         返回:
             (是否可以, 提示信息)
         """
-        subscription = self.get_subscription_type(user_id)
-        
-        # 付费用户无限制
-        if self.is_pro_user(user_id):
+        # 先判断订阅类型：付费用户无限制，直接返回，不查询使用次数
+        subscription, _ = self._resolve(user_id)
+        if self.is_pro_user(user_id, subscription):
             return True, ""
         
         # 免费用户检查使用次数
@@ -92,32 +187,48 @@ class SubscriptionManager:
     
     def get_usage_info(self, user_id: int) -> dict:
         """
-        获取用户使用信息
+        获取用户使用信息（同一请求内多次调用只计算一次，见 begin_request）
         
         参数:
             user_id: 用户ID
             
         返回:
-            使用信息字典
+            使用信息字典（同一请求内的调用方共享，不要修改）
         """
-        subscription = self.get_subscription_type(user_id)
-        usage = self.db.get_monthly_usage(user_id)
+        cache = _request_cache.get()
+        if cache is None:
+            return self._compute_usage_info(user_id)
+        key = ('usage', user_id)
+        info = cache.get(key)
+        if info is None:
+            info = cache[key] = self._compute_usage_info(user_id)
+        return info
+    
+    def _compute_usage_info(self, user_id: int) -> dict:
+        """查询并计算用户使用信息（get_usage_info 的实现）"""
+        # 用户信息和本月使用次数一次取回，订阅类型、过期时间都从这一份数据得出
+        user, usage = self.db.get_user_with_usage(user_id)
+        subscription, user = self._resolve(user_id, user)
+        is_pro = self.is_pro_user(user_id, subscription)
         
         info = {
             'subscription_type': subscription,
-            'is_pro': self.is_pro_user(user_id),
+            'is_pro': is_pro,
             'monthly_usage': usage,
-            'monthly_limit': None if self.is_pro_user(user_id) else self.FREE_MONTHLY_LIMIT,
-            'remaining': None if self.is_pro_user(user_id) else (self.FREE_MONTHLY_LIMIT - usage)
+            'monthly_limit': None if is_pro else self.FREE_MONTHLY_LIMIT,
+            'remaining': None if is_pro else (self.FREE_MONTHLY_LIMIT - usage)
         }
         
-        # 获取订阅过期时间
-        user = self.db.get_user_by_id(user_id)
-        if user and user.get('subscription_expires_at'):
+        # 获取订阅过期时间（SQLite中为ISO格式字符串，PostgreSQL中已是datetime）
+        # 只有仍有效的付费订阅才显示；已过期但还未被 sweep_expired 降级的订阅按免费版处理，不显示过期时间
+        expires_at = user.get('subscription_expires_at') if user and is_pro else None
+        if isinstance(expires_at, datetime):
+            info['expires_at'] = expires_at
+        elif expires_at:
             try:
-                info['expires_at'] = datetime.fromisoformat(user['subscription_expires_at'])
-            except:
-                pass
+                info['expires_at'] = datetime.fromisoformat(expires_at)
+            except (ValueError, TypeError):
+                logger.warning("用户 %s 的订阅过期时间无法解析: %r", user_id, expires_at)
         
         return info
     
@@ -132,59 +243,29 @@ class SubscriptionManager:
         """
         expires_at = datetime.now() + timedelta(days=duration_days)
         self.db.update_subscription(user_id, subscription_type, expires_at)
+        
+        # 本次请求中之后读取的使用信息也要反映新的订阅
+        cache = _request_cache.get()
+        if cache is not None:
+            cache.pop(('usage', user_id), None)
+    
+    def sweep_expired(self) -> int:
+        """
+        把所有已过期的订阅降级为免费用户
+        
+        由 app.py 的 sweep_expired_subscriptions 调用（每个进程每小时最多一次），
+        不运行界面的部署也可以用cron定时调用。
+        
+        返回:
+            降级的用户数
+        """
+        return self.db.downgrade_expired_subscriptions(datetime.now())
     
-    def get_subscription_plans(self) -> list:
+    def get_subscription_plans(self) -> tuple:
         """
         获取订阅计划列表
         
         返回:
-            订阅计划列表
-        """
-        return [
-            {
-                'id': 'free',
-                'name': '免费版',
-                'price': 0,
-                'features': [
-                    '每月3次计算',
-                    '基础图表',
-                    'Excel导出',
-                    '基础PDF报告'
-                ]
-            },
-            {
-                'id': 'pro_monthly',
-                'name': '专业版（月付）',
-                'price': 29,
-                'period': '月',
-                'features': [
-                    '无限次计算',
-                    '多场景对比（最多5个）',
-                    '高级分析报告',
-                    '历史记录保存（无限）',
-                    '高级PDF报告',
-                    '预算优化建议',
-                    '无广告'
-                ]
-            },
-            {
-                'id': 'pro_yearly',
-                'name': '专业版（年付）',
-                'price': 299,
-                'period': '年',
-                'original_price': 348,  # 29 * 12
-                'discount': '14%',
-                'features': [
-                    '无限次计算',
-                    '多场景对比（最多5个）',
-                    '高级分析报告',
-                    '历史记录保存（无限）',
-                    '高级PDF报告',
-                    '预算优化建议',
-                    '无广告',
-                    '优先支持'
-                ]
-            }
-        ]
-
-
+            订阅计划（模块级只读常量，所有调用方共享，不要修改）
+        """
+        return _SUBSCRIPTION_PLANS
@@ -4,25 +4,35 @@
 测试所有商业化功能
 """
 
+import os
 import sys
+import json
+import traceback
+from datetime import datetime, timedelta
+import auth
+import database
 from database import Database
+from calculator import StudyCostCalculator
 from auth import hash_password, verify_password, register_user, authenticate_user
 from subscription import SubscriptionManager
 from stats import StatsManager
 
-def test_database():
+# 测试用户的密码哈希只计算一次（哈希算法故意设计得很慢），各测试共用
+TEST_PASSWORD = "test123"
+TEST_PASSWORD_HASH = hash_password(TEST_PASSWORD)
+
+def test_database(db: Database):
     """测试数据库功能"""
     print("=" * 50)
     print("测试数据库功能")
     print("=" * 50)
     
-    db = Database()
     print(f"✅ 数据库类型: {db.db_type}")
     print(f"✅ 数据库初始化成功")
     
     # 测试创建用户
     test_email = "test@example.com"
-    password_hash = hash_password("test123")
+    password_hash = TEST_PASSWORD_HASH
     user_id = db.create_user(test_email, password_hash)
     
     if user_id:
@@ -42,8 +52,11 @@ def test_database():
     # 测试保存计算记录
     inputs = {"country": "葡萄牙", "city": "里斯本"}
     results = {"balance": 1000.0}
-    calc_id = db.save_calculation(user_id, "葡萄牙", "里斯本", inputs, results)
-    print(f"✅ 保存计算记录成功: ID={calc_id}")
+    calc_id, usage_count = db.save_calculation(user_id, "葡萄牙", "里斯本", inputs, results)
+    print(f"✅ 保存计算记录成功: ID={calc_id}, 本月第 {usage_count} 次")
+    
+    # 保存时返回的计数应与查询结果一致
+    assert db.get_monthly_usage(user_id) == usage_count
     
     # 测试获取计算历史
     calculations = db.get_user_calculations(user_id, limit=10)
@@ -56,14 +69,14 @@ def test_database():
     print("\n✅ 数据库测试完成\n")
     return user_id
 
-def test_auth():
+def test_auth(db: Database):
     """测试认证功能"""
     print("=" * 50)
     print("测试认证功能")
     print("=" * 50)
     
     # 测试密码哈希
-    password = "test123"
+    password = TEST_PASSWORD
     password_hash = hash_password(password)
     print(f"✅ 密码哈希生成成功: {password_hash[:20]}...")
     
@@ -71,28 +84,33 @@ def test_auth():
     is_valid = verify_password(password, password_hash)
     print(f"✅ 密码验证: {'成功' if is_valid else '失败'}")
     
-    # 测试注册（如果用户不存在）
-    success, message = register_user("newuser@example.com", "password123")
-    print(f"✅ 注册测试: {message}")
-    
-    # 测试登录
-    success, user_id, message = authenticate_user("newuser@example.com", "password123")
-    print(f"✅ 登录测试: {message}, User ID: {user_id if success else 'N/A'}")
+    # 认证模块临时使用同一个测试数据库，测试结束后恢复
+    saved_db = auth._db
+    auth._db = db
+    try:
+        # 测试注册（如果用户不存在）
+        success, message = register_user("newuser@example.com", "password123")
+        print(f"✅ 注册测试: {message}")
+        
+        # 测试登录
+        success, user_id, message = authenticate_user("newuser@example.com", "password123")
+        print(f"✅ 登录测试: {message}, User ID: {user_id if success else 'N/A'}")
+    finally:
+        auth._db = saved_db
     
     print("\n✅ 认证测试完成\n")
 
-def test_subscription():
+def test_subscription(db: Database):
     """测试订阅功能"""
     print("=" * 50)
     print("测试订阅功能")
     print("=" * 50)
     
-    manager = SubscriptionManager()
+    manager = SubscriptionManager(db)
     
     # 创建测试用户
-    db = Database()
     test_email = "subtest@example.com"
-    password_hash = hash_password("test123")
+    password_hash = TEST_PASSWORD_HASH
     user_id = db.create_user(test_email, password_hash)
     
     if not user_id:
@@ -116,21 +134,27 @@ def test_subscription():
         # 测试使用信息
         usage_info = manager.get_usage_info(user_id)
         print(f"✅ 使用信息: {usage_info}")
+        assert 'expires_at' in usage_info
+        
+        # 已过期但尚未被定时任务降级的订阅按免费版处理，不再显示过期时间
+        db.update_subscription(user_id, 'pro_monthly', datetime.now() - timedelta(days=1))
+        usage_info = manager.get_usage_info(user_id)
+        assert not usage_info['is_pro'] and 'expires_at' not in usage_info
+        print(f"✅ 过期订阅的使用信息: {usage_info}")
     
     print("\n✅ 订阅测试完成\n")
 
-def test_stats():
+def test_stats(db: Database):
     """测试统计功能"""
     print("=" * 50)
     print("测试统计功能")
     print("=" * 50)
     
-    manager = StatsManager()
+    manager = StatsManager(db)
     
     # 创建测试用户
-    db = Database()
     test_email = "statstest@example.com"
-    password_hash = hash_password("test123")
+    password_hash = TEST_PASSWORD_HASH
     user_id = db.create_user(test_email, password_hash)
     
     if not user_id:
@@ -138,11 +162,10 @@ def test_stats():
         user_id = user['id'] if user else None
     
     if user_id:
-        # 保存一些测试数据
-        for i in range(3):
-            inputs = {"country": "葡萄牙", "city": "里斯本"}
-            results = {"balance": 1000.0 + i}
-            db.save_calculation(user_id, "葡萄牙", "里斯本", inputs, results)
+        # 保存一些测试数据（一个事务批量写入，并计入本月使用次数）
+        inputs = {"country": "葡萄牙", "city": "里斯本"}
+        rows = [(user_id, "葡萄牙", "里斯本", inputs, {"balance": 1000.0 + i}) for i in range(3)]
+        db.save_calculations_bulk(rows, count_usage=True)
         
         # 测试用户统计
         stats = manager.get_user_stats(user_id)
@@ -160,24 +183,121 @@ def test_stats():
     
     print("\n✅ 统计测试完成\n")
 
+def _check_fresh_database(db: Database):
+    """在刚初始化的空数据库上执行常用查询（PostgreSQL上会用到已准备的语句）"""
+    test_email = "fresh@example.com"
+    assert db.get_user_by_email(test_email) is None
+    user_id = db.create_user(test_email, TEST_PASSWORD_HASH)
+    assert db.get_user_by_id(user_id)['email'] == test_email
+    assert db.get_monthly_usage(user_id) == 0
+
+def test_init_empty_database():
+    """测试在空数据库上初始化（建表之前不能准备引用这些表的语句）"""
+    print("=" * 50)
+    print("测试空数据库初始化")
+    print("=" * 50)
+    
+    _check_fresh_database(Database.for_tests())
+    print("✅ SQLite空数据库初始化成功")
+    
+    database_url = os.getenv('DATABASE_URL')
+    if database.POSTGRESQL_AVAILABLE and database_url and 'postgres' in database_url.lower():
+        _check_empty_postgresql(database_url)
+        print("✅ PostgreSQL空数据库初始化成功")
+    else:
+        print("⚠️ 未配置PostgreSQL（DATABASE_URL），跳过PostgreSQL空数据库测试")
+    
+    print("\n✅ 空数据库初始化测试完成\n")
+
+def _check_empty_postgresql(database_url: str):
+    """在一个新建的空schema中初始化PostgreSQL数据库，测试结束后删除该schema"""
+    import psycopg2
+    
+    schema = f"test_empty_{os.getpid()}"
+    admin = psycopg2.connect(database_url)
+    admin.autocommit = True
+    with admin.cursor() as c:
+        c.execute(f"CREATE SCHEMA {schema}")
+    
+    # 只搜索新schema，public中已有的表不可见，相当于一个空数据库
+    separator = '&' if '?' in database_url else '?'
+    schema_url = f"{database_url}{separator}options=-csearch_path%3D{schema}"
+    os.environ['DATABASE_URL'] = schema_url
+    try:
+        _check_fresh_database(Database())
+    finally:
+        os.environ['DATABASE_URL'] = database_url
+        # 关闭为该schema建立的共享连接池
+        pool = database._pools.pop(schema_url, None)
+        if pool is not None:
+            pool.closeall()
+        with admin.cursor() as c:
+            c.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+def test_json_roundtrip(db: Database):
+    """测试计算记录的JSON存取（安装与未安装orjson时结果一致）"""
+    print("=" * 50)
+    print("测试计算记录JSON存取")
+    print("=" * 50)
+    
+    user_id = db.create_user("jsontest@example.com", TEST_PASSWORD_HASH)
+    
+    # 与 app.py 保存的内容相同的真实计算结果
+    calculator = StudyCostCalculator(
+        country="葡萄牙", city="里斯本", rent_type="合租", has_job=True,
+        weekly_hours=15.0, hourly_wage=8.0, initial_deposit=5000.0,
+        tuition_total=5000.0, tuition_payment="分期"
+    )
+    summary = calculator.get_summary()
+    inputs = {
+        'country': "葡萄牙", 'city': "里斯本", 'rent_type': "合租", 'has_job': True,
+        'weekly_hours': 15.0, 'hourly_wage': 8.0, 'initial_deposit': 5000.0,
+        'tuition_total': 5000.0, 'tuition_payment': "分期"
+    }
+    results = {key: summary[key] for key in (
+        'monthly_income', 'monthly_expense_base', 'final_balance',
+        'min_balance', 'critical_months', 'need_support'
+    )}
+    # 整数键和datetime：orjson默认不支持或格式与标准库不同
+    results['balance_by_month'] = {i + 1: balance for i, balance in enumerate(summary['cashflow'].balance)}
+    results['calculated_at'] = datetime(2024, 9, 1, 12, 30, 5, 123)
+    
+    # 以标准库 json.dumps 的结果为准
+    expected = [json.loads(json.dumps(data, default=str)) for data in (inputs, results)]
+    
+    saved_orjson = database.ORJSON_AVAILABLE
+    texts = set()
+    try:
+        for use_orjson in ([True, False] if saved_orjson else [False]):
+            database.ORJSON_AVAILABLE = use_orjson
+            texts.add(database._json_dumps(results))
+            calc_id, _ = db.save_calculation(user_id, "葡萄牙", "里斯本", inputs, results)
+            record = next(r for r in db.get_user_calculations(user_id) if r['id'] == calc_id)
+            assert [record['inputs'], record['results']] == expected
+            print(f"✅ {'orjson' if use_orjson else 'json'} 存取一致")
+    finally:
+        database.ORJSON_AVAILABLE = saved_orjson
+    
+    assert len(texts) == 1
+    
+    print("\n✅ JSON存取测试完成\n")
+
 def main():
     """运行所有测试"""
     print("\n" + "=" * 50)
     print("开始功能测试")
     print("=" * 50 + "\n")
     
+    # 所有测试共用一个内存数据库（不读写磁盘上的 app.db），每个测试结束后回滚，互不影响
+    db = Database.for_tests()
+    
     try:
-        # 测试数据库
-        user_id = test_database()
-        
-        # 测试认证
-        test_auth()
-        
-        # 测试订阅
-        test_subscription()
+        test_init_empty_database()
         
-        # 测试统计
-        test_stats()
+        for test in (test_database, test_auth, test_subscription, test_stats, test_json_roundtrip):
+            with db.rollback_after():
+                test(db)
         
         print("=" * 50)
         print("✅ 所有测试完成！")
@@ -185,7 +305,6 @@ def main():
         
     except Exception as e:
         print(f"\n❌ 测试失败: {str(e)}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
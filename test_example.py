@@ -25,7 +25,7 @@ def test_example_1():
     )
     
     summary = calculator.get_summary()
-    df = summary["cashflow_df"]
+    df = summary["cashflow"].to_dataframe()
     
     print(f"\n月收入: {summary['monthly_income']:.2f} €")
     print(f"月基础支出: {summary['monthly_expense_base']:.2f} €")
@@ -61,7 +61,7 @@ def test_example_2():
     )
     
     summary = calculator.get_summary()
-    df = summary["cashflow_df"]
+    df = summary["cashflow"].to_dataframe()
     
     print(f"\n月收入: {summary['monthly_income']:.2f} €")
     print(f"月基础支出: {summary['monthly_expense_base']:.2f} €")
@@ -97,7 +97,7 @@ def test_example_3():
     )
     
     summary = calculator.get_summary()
-    df = summary["cashflow_df"]
+    df = summary["cashflow"].to_dataframe()
     
     print(f"\n月收入: {summary['monthly_income']:.2f} €")
     print(f"月基础支出: {summary['monthly_expense_base']:.2f} €")